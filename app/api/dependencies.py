@@ -1,5 +1,6 @@
 from typing import Optional, Union
-from starlite import Request
+from decimal import Decimal
+from starlite import Parameter, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.utils.auth import Authentication
 from app.common.exception_handlers import RequestError
@@ -35,3 +36,18 @@ async def get_client(
         db, request.headers.get("guestuserid")
     )
     return guestuser
+
+
+async def get_listing_filters(
+    min_price: Optional[Decimal] = Parameter(ge=0, default=None),
+    max_price: Optional[Decimal] = Parameter(ge=0, default=None),
+    active: Optional[bool] = None,
+    closing_within_hours: Optional[int] = Parameter(gt=0, default=None),
+) -> dict:
+    # Filters shared by the listing feeds, passed to the managers as keywords
+    return {
+        "min_price": min_price,
+        "max_price": max_price,
+        "active": active,
+        "closing_within_hours": closing_within_hours,
+    }
@@ -4,7 +4,7 @@ from app.api.routes.auth import auth_handlers
 from app.api.routes.listings import listings_handlers
 from app.api.routes.auctioneer import auctioneer_handlers
 from app.api.routes.healthcheck import healthcheck
-from app.api.dependencies import get_client, get_current_user
+from app.api.dependencies import get_client, get_current_user, get_listing_filters
 
 general_router = Router(
     path="/api/v3/general",
@@ -29,6 +29,7 @@ listings_router = Router(
     dependencies={
         "user": Provide(get_current_user),
         "client": Provide(get_client),
+        "filters": Provide(get_listing_filters),
     },
 )
 
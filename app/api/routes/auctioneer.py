@@ -1,12 +1,10 @@
 from typing import Optional
-from starlite import Controller, get, post, put, patch
+from starlite import Controller, MediaType, Parameter, get, post, put, patch
+from starlite.response import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.api.schemas.listings import (
-    ListingsResponseSchema,
-    BidsResponseDataSchema,
-    BidsResponseSchema,
-)
+from app.api.schemas.listings import ListingsResponseSchema, BidsResponseSchema
 
 from app.api.schemas.auctioneer import (
     CreateListingSchema,
@@ -16,6 +14,10 @@ from app.api.schemas.auctioneer import (
     UpdateProfileResponseSchema,
     ProfileResponseSchema,
 )
+from app.api.utils.auctions import auction_closer
+from app.api.utils.feeds import Feed, stream_listings
+from app.api.utils.pagination import decode_cursor, paginate
+from app.api.utils.projections import stream_bids
 from app.common.exception_handlers import RequestError
 from app.db.managers.listings import (
     category_manager,
@@ -23,8 +25,9 @@ from app.db.managers.listings import (
     bid_manager,
 )
 from app.db.managers.accounts import user_manager
-from app.db.managers.base import file_manager
+from app.db.managers.base import file_manager, stream_detached
 from app.db.models.accounts import User
+from app.db.models.listings import Listing
 
 
 class ProfileView(Controller):
@@ -60,19 +63,32 @@ class AuctioneerListingsView(Controller):
 
     @get(
         summary="Retrieve all listings by the current user",
-        description="This endpoint retrieves all listings by the current user",
+        description="This endpoint retrieves all listings by the current user. Pass 'quantity' to paginate (0 or none for every listing) and the returned 'next_cursor' as 'cursor' to fetch the next page",
     )
     async def retrieve_listings(
-        self, user: User, quantity: Optional[int], db: AsyncSession
+        self,
+        user: User,
+        db: AsyncSession,
+        quantity: Optional[int] = Parameter(ge=0, default=None),
+        cursor: Optional[str] = None,
     ) -> ListingsResponseSchema:
-        listings = await listing_manager.get_by_auctioneer_id(db, user.id)
-
-        if quantity:
-            # Retrieve based on amount
-            listings = listings[:quantity]
-        return ListingsResponseSchema(
-            message="Auctioneer Listings fetched", data=listings
+        if not quantity:
+            # Every listing, streamed so that memory stays flat however many there are
+            chunks = stream_detached(
+                db, listing_manager.stream_by_auctioneer_id, user.id
+            )
+            return StreamingResponse(
+                stream_listings("Auctioneer Listings fetched", chunks),
+                media_type=MediaType.JSON,
+            )
+
+        listings = await listing_manager.get_by_auctioneer_id(
+            db, user.id, quantity, decode_cursor(cursor), projected=True
         )
+        # Retrieve based on amount
+        listings, next_cursor = paginate(listings, quantity)
+        # Listings aren't flagged as watched for their auctioneer
+        return Feed(listings, next_cursor).render("Auctioneer Listings fetched", None)
 
     @post(
         summary="Create a listing",
@@ -110,8 +126,11 @@ class AuctioneerListingsView(Controller):
         data.pop("file_type")
 
         listing = await listing_manager.create(db, data)
+        auction_closer.schedule(listing.closing_date)
+        # The auctioneer (current user) and category are at hand, no need to load them
+        data = {**listing.dict(), "auctioneer": user, "category": category}
         return CreateListingResponseSchema(
-            message="Listing created successfully", data=listing
+            message="Listing created successfully", data=data
         )
 
     @patch(
@@ -122,20 +141,23 @@ class AuctioneerListingsView(Controller):
     async def update_listing(
         self, slug: str, data: UpdateListingSchema, user: User, db: AsyncSession
     ) -> CreateListingResponseSchema:
-        category = data.category
-
-        listing = await listing_manager.get_by_slug(db, slug)
+        # Only the category is needed, to respond with it when it isn't changed
+        listing = await listing_manager.get_by_slug(
+            db, slug, [joinedload(Listing.category)]
+        )
         if not listing:
             raise RequestError(err_msg="Listing does not exist!", status_code=404)
 
         if user.id != listing.auctioneer_id:
             raise RequestError(err_msg="This listing doesn't belong to you!")
+        category = listing.category
 
         # Remove keys with values of None
         data = data.dict()
         data = {k: v for k, v in data.items() if v not in (None, "")}
 
-        if category:
+        if data.get("category"):
+            category = data["category"]
             if not category == "other":
                 category = await category_manager.get_by_slug(db, category)
                 if not category:
@@ -153,14 +175,17 @@ class AuctioneerListingsView(Controller):
 
         file_type = data.get("file_type")
         if file_type:
-            await file_manager.delete(db, listing.image)
+            await file_manager.delete_by_id(db, listing.image_id)
             # Create file object
             file = await file_manager.create(db, {"resource_type": file_type})
             data.update({"image_id": file.id})
         data.pop("file_type", None)
         listing = await listing_manager.update(db, listing, data)
+        if listing.active:
+            auction_closer.schedule(listing.closing_date)
+        data = {**listing.dict(), "auctioneer": user, "category": category}
         return CreateListingResponseSchema(
-            message="Listing updated successfully", data=listing
+            message="Listing updated successfully", data=data
         )
 
     @get(
@@ -180,12 +205,12 @@ class AuctioneerListingsView(Controller):
         if user.id != listing.auctioneer_id:
             raise RequestError(err_msg="This listing doesn't belong to you!")
 
-        bids = await bid_manager.get_by_listing_id(db, listing.id)
-        data = BidsResponseDataSchema(
-            listing=listing.name,
-            bids=bids,
+        # Streamed, a listing's bids are unbounded
+        chunks = stream_detached(db, bid_manager.stream_by_listing_id, listing.id)
+        return StreamingResponse(
+            stream_bids("Listing Bids fetched", listing.name, chunks),
+            media_type=MediaType.JSON,
         )
-        return BidsResponseSchema(message="Listing Bids fetched", data=data)
 
 
 auctioneer_handlers = [ProfileView, AuctioneerListingsView]
@@ -1,4 +1,5 @@
 from typing import Optional, Union
+from datetime import datetime
 from starlite import Controller, get, post
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -21,7 +22,7 @@ from app.db.managers.accounts import user_manager, otp_manager, jwt_manager
 from app.db.managers.listings import watchlist_manager
 
 from app.api.utils.emails import send_email
-from app.core.security import verify_password
+from app.core.security import password_needs_update, verify_password
 from app.api.utils.auth import Authentication
 from app.db.models.base import GuestUser
 
@@ -75,14 +76,16 @@ class VerifyEmailView(Controller):
         if user_by_email.is_email_verified:
             return ResponseSchema(message="Email already verified")
 
-        otp = await otp_manager.get_by_user_id(db, user_by_email.id)
-        if not otp or otp.code != data.otp:
+        otp = await otp_manager.consume(db, user_by_email.id, data.otp)
+        if not otp:
             raise RequestError(err_msg="Incorrect Otp", status_code=404)
-        if otp.check_expiration():
+        if otp.expires_at < datetime.utcnow():
+            # Kept until purged, not burned by the attempt
+            await db.rollback()
             raise RequestError(err_msg="Expired Otp")
 
+        # Committed along with the code's deletion
         user = await user_manager.update(db, user_by_email, {"is_email_verified": True})
-        await otp_manager.delete(db, otp)
         # Send welcome email
         await send_email(db, user, "welcome")
         return ResponseSchema(message="Account verification successful")
@@ -151,13 +154,16 @@ class SetNewPasswordView(Controller):
         if not user_by_email:
             raise RequestError(err_msg="Incorrect Email", status_code=404)
 
-        otp = await otp_manager.get_by_user_id(db, user_by_email.id)
-        if not otp or otp.code != otp_code:
+        otp = await otp_manager.consume(db, user_by_email.id, otp_code)
+        if not otp:
             raise RequestError(err_msg="Incorrect Otp", status_code=404)
 
-        if otp.check_expiration():
+        if otp.expires_at < datetime.utcnow():
+            await db.rollback()
             raise RequestError(err_msg="Expired Otp")
 
+        # Committed along with the code's deletion. If hashing the password fails
+        # (say the hasher is busy), the code is rolled back and can be used again.
         await user_manager.update(db, user_by_email, {"password": password})
 
         # Send password reset success email
@@ -182,11 +188,14 @@ class LoginView(Controller):
         email = data.email
         plain_password = data.password
         user = await user_manager.get_by_email(db, email)
-        if not user or verify_password(plain_password, user.password) == False:
+        if not user or not await verify_password(plain_password, user.password):
             raise RequestError(err_msg="Invalid credentials", status_code=401)
 
         if not user.is_email_verified:
             raise RequestError(err_msg="Verify your email first", status_code=401)
+        if password_needs_update(user.password):
+            # Hashed at another cost than this deployment's, the password is at hand
+            user = await user_manager.update(db, user, {"password": plain_password})
         await jwt_manager.delete_by_user_id(db, user.id)
 
         # Create tokens and store in jwt model
@@ -1,4 +1,5 @@
-from starlite import Controller, get, post
+from typing import Optional
+from starlite import Controller, Parameter, Response, get, post
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.schemas.general import (
     SubscriberSchema,
@@ -7,6 +8,7 @@ from app.api.schemas.general import (
     ReviewsResponseSchema,
 )
 
+from app.common.responses import etag_matches, make_etag, not_modified
 from app.db.managers.general import (
     sitedetail_manager,
     subscriber_manager,
@@ -21,9 +23,20 @@ class SiteDetailView(Controller):
         summary="Retrieve site details",
         description="This endpoint retrieves few details of the site/application",
     )
-    async def retrieve_site_details(self, db: AsyncSession) -> SiteDetailResponseSchema:
+    async def retrieve_site_details(
+        self,
+        db: AsyncSession,
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> SiteDetailResponseSchema:
+        version = await sitedetail_manager.get_version(db)
+        if version and etag_matches(if_none_match, make_etag(*version)):
+            return not_modified(make_etag(*version))
+
         sitedetail = await sitedetail_manager.get(db)
-        return SiteDetailResponseSchema(message="Site Details fetched", data=sitedetail)
+        return Response(
+            SiteDetailResponseSchema(message="Site Details fetched", data=sitedetail),
+            headers={"ETag": make_etag(sitedetail.id, sitedetail.updated_at)},
+        )
 
 
 class SubscriberCreateView(Controller):
@@ -53,9 +66,20 @@ class ReviewsView(Controller):
         summary="Retrieve site reviews",
         description="This endpoint retrieves a few reviews of the application",
     )
-    async def reviews(self, db: AsyncSession) -> ReviewsResponseSchema:
+    async def reviews(
+        self,
+        db: AsyncSession,
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> ReviewsResponseSchema:
+        etag = make_etag(*await review_manager.get_version(db))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         reviews = await review_manager.get_active(db)
-        return ReviewsResponseSchema(message="Reviews fetched", data=reviews)
+        return Response(
+            ReviewsResponseSchema(message="Reviews fetched", data=reviews),
+            headers={"ETag": etag},
+        )
 
 
 general_handlers = [SiteDetailView, SubscriberCreateView, ReviewsView]
@@ -1,5 +1,16 @@
-from starlite import Controller, Response, get, post
+from starlite import (
+    Controller,
+    Parameter,
+    Response,
+    WebSocket,
+    get,
+    post,
+    websocket,
+)
+from starlite.exceptions import WebSocketDisconnect
+from starlite.response import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 
 from app.api.schemas.listings import (
     AddOrRemoveWatchlistSchema,
@@ -9,19 +20,40 @@ from app.api.schemas.listings import (
     ListingResponseSchema,
     CategoriesResponseSchema,
     CreateBidSchema,
+    BidDataSchema,
+    BidEventSchema,
     BidsResponseDataSchema,
     BidsResponseSchema,
     BidResponseSchema,
     AddOrRemoveWatchlistResponseSchema,
+    ListingsSort,
+    ListingFacetsDataSchema,
+    ListingFacetsResponseSchema,
 )
 from app.db.managers.base import guestuser_manager
 from app.db.managers.listings import (
     listing_manager,
-    bid_manager,
+    related_listing_manager,
     watchlist_manager,
     category_manager,
+    LISTING_DISPLAY,
+    PRICE_BUCKETS,
+)
+from app.api.utils.bids import (
+    bid_sequencer,
+    render_bid_event,
+    stream_bid_events,
+    top_bids_cache,
+)
+from app.api.utils.broadcast import bid_broadcast
+from app.api.utils.feeds import feed_cache
+from app.api.utils.pagination import (
+    decode_cursor,
+    paginate,
+    sort_key,
 )
 from app.common.exception_handlers import RequestError
+from app.common.responses import etag_matches, make_etag, not_modified
 from app.db.models.accounts import User
 from typing import Optional, Union
 
@@ -33,32 +65,110 @@ class ListingsView(Controller):
 
     @get(
         summary="Retrieve all listings",
-        description="This endpoint retrieves all listings",
+        description="This endpoint retrieves all listings, newest first unless ordered by 'sort'. Filter by 'min_price', 'max_price', 'active' and 'closing_within_hours'. Pass 'quantity' to paginate (0 or none for every listing) and the returned 'next_cursor' as 'cursor' to fetch the next page",
     )
     async def retrieve_listings(
         self,
         db: AsyncSession,
         client: Optional[Union["User", "GuestUser"]],
-        quantity: Optional[int],
+        filters: dict,
+        sort: ListingsSort = ListingsSort.NEWEST,
+        quantity: Optional[int] = Parameter(ge=0, default=None),
+        cursor: Optional[str] = None,
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
     ) -> ListingsResponseSchema:
-        listings = await listing_manager.get_all(db)
-        if quantity:
+        cursor_keyset = decode_cursor(cursor, sort_key(sort))
+        key = feed_cache.key("listings", sort, tuple(filters.items()), quantity, cursor)
+        feed = feed_cache.get(key)
+        if not feed:
+            listings = await listing_manager.get_all(
+                db, quantity, cursor_keyset, sort, projected=True, **filters
+            )
             # Retrieve based on amount
-            listings = listings[:quantity]
+            listings, next_cursor = paginate(listings, quantity, sort)
+            feed = feed_cache.set(key, listings, next_cursor)
 
-        data = [
-            ListingDataSchema(
-                watchlist=True
-                if await watchlist_manager.get_by_client_id_and_listing_id(
-                    db, client.id if client else None, listing.id
-                )
-                else False,
-                time_left_seconds=listing.time_left_seconds,
-                **listing.dict()
+        watched_ids = await watchlist_manager.get_listing_ids_by_client_id(
+            db, client.id if client else None, feed.listing_ids
+        )
+        # The cached feed's version and the client's flags on it tag the response.
+        # Weakly, as the time left on listings changes on its own.
+        etag = make_etag(feed.version, sorted(watched_ids), weak=True)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        response = feed.render("Listings fetched", watched_ids)
+        response.headers["ETag"] = etag
+        return response
+
+    @get(
+        "/search",
+        summary="Search listings",
+        description="This endpoint searches listings by name and description, best matches first. Filter by 'category' (slug, or 'other'), 'min_price', 'max_price', 'active' and 'closing_within_hours'. Pass 'quantity' to paginate (0 or none for every listing) and the returned 'next_cursor' as 'cursor' to fetch the next page",
+    )
+    async def search_listings(
+        self,
+        db: AsyncSession,
+        client: Optional[Union["User", "GuestUser"]],
+        filters: dict,
+        q: str = Parameter(min_length=1, max_length=200),
+        category: Optional[str] = None,
+        quantity: Optional[int] = Parameter(ge=0, default=None),
+        cursor: Optional[str] = None,
+    ) -> ListingsResponseSchema:
+        cursor_keyset = decode_cursor(cursor, "rank")
+        key = feed_cache.key(
+            "search", q, category, tuple(filters.items()), quantity, cursor
+        )
+        feed = feed_cache.get(key)
+        if not feed:
+            if category and category != "other":
+                category = await category_manager.get_by_slug(db, category)
+                if not category:
+                    raise RequestError(err_msg="Invalid category", status_code=404)
+            listings = await listing_manager.search(
+                db, q, category, quantity, cursor_keyset, projected=True, **filters
+            )
+            listings, next_cursor = paginate(listings, quantity, "rank")
+            feed = feed_cache.set(key, listings, next_cursor)
+
+        watched_ids = await watchlist_manager.get_listing_ids_by_client_id(
+            db, client.id if client else None, feed.listing_ids
+        )
+        return feed.render("Listings fetched", watched_ids)
+
+    @get(
+        "/facets",
+        summary="Retrieve listing facets",
+        description="This endpoint counts listings per category and price range. Filter by 'min_price', 'max_price', 'active' and 'closing_within_hours'",
+    )
+    async def retrieve_facets(
+        self, db: AsyncSession, filters: dict
+    ) -> ListingFacetsResponseSchema:
+        category_counts, price_counts = await listing_manager.get_facets(db, **filters)
+        categories = {
+            category.id: category for category in await category_manager.get_all(db)
+        }
+        category_facets = []
+        for category_id, count in category_counts:
+            category = categories.get(category_id)
+            if category_id and not category:
+                # Created by another worker after this one cached the categories
+                continue
+            category_facets.append(
+                {
+                    "name": category.name if category else "Other",
+                    "slug": category.slug if category else "other",
+                    "count": count,
+                }
             )
-            for listing in listings
+        bounds = [0, *PRICE_BUCKETS, None]
+        price_facets = [
+            {"min": bounds[bucket], "max": bounds[bucket + 1], "count": count}
+            for bucket, count in price_counts
         ]
-        return ListingsResponseSchema(message="Listings fetched", data=data)
+        data = ListingFacetsDataSchema(categories=category_facets, prices=price_facets)
+        return ListingFacetsResponseSchema(message="Listing facets fetched", data=data)
 
     @get(
         "/detail/{slug:str}",
@@ -68,13 +178,13 @@ class ListingsView(Controller):
     async def retrieve_listing_detail(
         self, slug: str, db: AsyncSession
     ) -> ListingResponseSchema:
-        listing = await listing_manager.get_by_slug(db, slug)
+        listing = await listing_manager.get_by_slug(db, slug, LISTING_DISPLAY)
         if not listing:
             raise RequestError(err_msg="Listing does not exist!", status_code=404)
 
-        related_listings = (
-            await listing_manager.get_related_listings(db, listing.category_id, slug)
-        )[:3]
+        related_listings = await related_listing_manager.get_related_listings(
+            db, listing
+        )
         data = ListingDetailDataSchema(
             listing=ListingDataSchema.from_orm(listing),
             related_listings=related_listings,
@@ -99,7 +209,7 @@ class ListingsByWatchListView(Controller):
             ListingDataSchema(
                 watchlist=True,
                 time_left_seconds=watchlist.listing.time_left_seconds,
-                **watchlist.listing.dict()
+                **watchlist.listing.dict(),
             )
             for watchlist in watchlists
         ]
@@ -161,17 +271,34 @@ class CategoryListingsView(Controller):
         summary="Retrieve all categories",
         description="This endpoint retrieves all categories",
     )
-    async def retrieve_categories(self, db: AsyncSession) -> CategoriesResponseSchema:
+    async def retrieve_categories(
+        self,
+        db: AsyncSession,
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> CategoriesResponseSchema:
         categories = await category_manager.get_all(db)
-        return CategoriesResponseSchema(message="Categories fetched", data=categories)
+        etag = make_etag(*((category.name, category.slug) for category in categories))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(
+            CategoriesResponseSchema(message="Categories fetched", data=categories),
+            headers={"ETag": etag},
+        )
 
     @get(
         "/{slug:str}",
         summary="Retrieve all listings by category",
-        description="This endpoint retrieves all listings in a particular category. Use slug 'other' for category other",
+        description="This endpoint retrieves all listings in a particular category. Use slug 'other' for category other. Sorts, filters and paginates like the listings endpoint",
     )
     async def retrieve_category_listings(
-        self, slug: str, db: AsyncSession, client: Optional[Union["User", "GuestUser"]]
+        self,
+        slug: str,
+        db: AsyncSession,
+        client: Optional[Union["User", "GuestUser"]],
+        filters: dict,
+        sort: ListingsSort = ListingsSort.NEWEST,
+        quantity: Optional[int] = Parameter(ge=0, default=None),
+        cursor: Optional[str] = None,
     ) -> ListingsResponseSchema:
         # listings with category 'other' have category column as null
         category = None
@@ -180,20 +307,22 @@ class CategoryListingsView(Controller):
             if not category:
                 raise RequestError(err_msg="Invalid category", status_code=404)
 
-        listings = await listing_manager.get_by_category(db, category)
-        data = [
-            ListingDataSchema(
-                watchlist=True
-                if await watchlist_manager.get_by_client_id_and_listing_id(
-                    db, client.id if client else None, listing.id
-                )
-                else False,
-                time_left_seconds=listing.time_left_seconds,
-                **listing.dict()
+        cursor_keyset = decode_cursor(cursor, sort_key(sort))
+        key = feed_cache.key(
+            "category", slug, sort, tuple(filters.items()), quantity, cursor
+        )
+        feed = feed_cache.get(key)
+        if not feed:
+            listings = await listing_manager.get_by_category(
+                db, category, quantity, cursor_keyset, sort, projected=True, **filters
             )
-            for listing in listings
-        ]
-        return ListingsResponseSchema(message="Category Listings fetched", data=data)
+            listings, next_cursor = paginate(listings, quantity, sort)
+            feed = feed_cache.set(key, listings, next_cursor)
+
+        watched_ids = await watchlist_manager.get_listing_ids_by_client_id(
+            db, client.id if client else None, feed.listing_ids
+        )
+        return feed.render("Category Listings fetched", watched_ids)
 
 
 class BidsView(Controller):
@@ -210,8 +339,7 @@ class BidsView(Controller):
         if not listing:
             raise RequestError(err_msg="Listing does not exist!", status_code=404)
 
-        bids = (await bid_manager.get_by_listing_id(db, listing.id))[:3]
-
+        bids = await top_bids_cache.fetch(db, listing)
         data = BidsResponseDataSchema(
             listing=listing.name,
             bids=bids,
@@ -225,45 +353,100 @@ class BidsView(Controller):
     async def create_bid(
         self, slug: str, data: CreateBidSchema, db: AsyncSession, user: User
     ) -> BidResponseSchema:
+        amount = data.amount
+        bid = await bid_sequencer.place(db, slug, user.id, amount)
+        if not bid:
+            # Not placed, the listing as it is now tells why
+            listing = await listing_manager.get_by_slug(db, slug)
+            if not listing:
+                raise RequestError(err_msg="Listing does not exist!", status_code=404)
+            elif user.id == listing.auctioneer_id:
+                raise RequestError(
+                    err_msg="You cannot bid your own product!", status_code=403
+                )
+            elif not listing.active:
+                raise RequestError(err_msg="This auction is closed!", status_code=410)
+            elif listing.time_left < 1:
+                raise RequestError(
+                    err_msg="This auction is expired and closed!", status_code=410
+                )
+            elif amount < listing.price:
+                raise RequestError(
+                    err_msg="Bid amount cannot be less than the bidding price!"
+                )
+            raise RequestError(err_msg="Bid amount must be more than the highest bid!")
+
+        previous_version = (bid.previous_highest_bid, bid.previous_bids_count)
+        version = (bid.amount, bid.previous_bids_count + bid.created)
+        # The bidder is the current user, loaded already
+        data = BidDataSchema(
+            user=user,
+            amount=bid.amount,
+            created_at=bid.created_at,
+            updated_at=bid.updated_at,
+        )
+        top_bids_cache.push(bid.listing_id, previous_version, version, user.id, data)
+        event = BidEventSchema(
+            event="bid", highest_bid=version[0], bids_count=version[1], bids=[data]
+        )
+        bid_broadcast.publish(slug, render_bid_event(event))
+        return BidResponseSchema(message="Bid added to listing", data=data)
+
+    @websocket("/stream")
+    async def stream_listing_bids(
+        self, socket: WebSocket, db: AsyncSession, slug: str
+    ) -> None:
+        # The same events as stream_listing_bid_events, over a WebSocket
+        events = stream_bid_events(db.bind, slug)
+        try:
+            snapshot = await events.__anext__()
+        except StopAsyncIteration:
+            await socket.close(code=4404, reason="Listing does not exist!")
+            return
+        await socket.accept()
+        await socket.send_text(snapshot)
+
+        async def forward():
+            async for event in events:
+                if event:
+                    await socket.send_text(event)
+            await socket.close()
+
+        forwarding = asyncio.create_task(forward())
+        try:
+            while True:
+                # Nothing is expected from clients, reading notices them leave
+                await socket.receive_data("text")
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forwarding.cancel()
+            await asyncio.gather(forwarding, return_exceptions=True)
+            await events.aclose()
+
+    @get(
+        "/events",
+        summary="Stream a listing's bids (SSE)",
+        description="This endpoint streams a snapshot of a listing's top bids followed by every bid placed on it, as server-sent events. A WebSocket stream of the same events is served at `/stream`.",
+        opt={"skip_compression": True},
+    )
+    async def stream_listing_bid_events(
+        self, db: AsyncSession, slug: str
+    ) -> StreamingResponse:
         listing = await listing_manager.get_by_slug(db, slug)
         if not listing:
             raise RequestError(err_msg="Listing does not exist!", status_code=404)
 
-        amount = data.amount
-        bids_count = listing.bids_count
-        if user.id == listing.auctioneer_id:
-            raise RequestError(
-                err_msg="You cannot bid your own product!", status_code=403
-            )
-        elif not listing.active:
-            raise RequestError(err_msg="This auction is closed!", status_code=410)
-        elif listing.time_left < 1:
-            raise RequestError(
-                err_msg="This auction is expired and closed!", status_code=410
-            )
-        elif amount < listing.price:
-            raise RequestError(
-                err_msg="Bid amount cannot be less than the bidding price!"
-            )
-        elif amount <= listing.highest_bid:
-            raise RequestError(err_msg="Bid amount must be more than the highest bid!")
-
-        bid = await bid_manager.get_by_user_and_listing_id(db, user.id, listing.id)
-        if bid:
-            # Update existing bid
-            bid = await bid_manager.update(db, bid, {"amount": amount})
-        else:
-            # Create new bid
-            bids_count += 1
-            bid = await bid_manager.create(
-                db,
-                {"user_id": user.id, "listing_id": listing.id, "amount": amount},
-            )
+        async def body():
+            async for event in stream_bid_events(db.bind, slug):
+                # Comments keep idle connections from being dropped by proxies
+                yield f"data: {event}\n\n" if event else ": keep-alive\n\n"
 
-        await listing_manager.update(
-            db, listing, {"highest_bid": amount, "bids_count": bids_count}
+        return StreamingResponse(
+            body(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
         )
-        return BidResponseSchema(message="Bid added to listing", data=bid)
 
 
 listings_handlers = [
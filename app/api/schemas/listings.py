@@ -1,5 +1,6 @@
 from typing import Optional, List, Any
 from uuid import UUID
+from enum import Enum
 
 from pydantic import BaseModel, validator, Field
 from datetime import datetime
@@ -101,6 +102,44 @@ class ListingResponseSchema(ResponseSchema):
 
 class ListingsResponseSchema(ResponseSchema):
     data: List[ListingDataSchema]
+    next_cursor: Optional[str] = Field(
+        None, example="Pass as 'cursor' for the next page"
+    )
+
+
+class ListingsSort(str, Enum):
+    # A leading '-' sorts descending. Ties are broken by created_at and id
+    NEWEST = "-created_at"
+    OLDEST = "created_at"
+    HIGHEST_BID = "-highest_bid"
+    LOWEST_BID = "highest_bid"
+    MOST_BIDS = "-bids_count"
+    FEWEST_BIDS = "bids_count"
+    HIGHEST_PRICE = "-price"
+    LOWEST_PRICE = "price"
+    CLOSING_LAST = "-closing_date"
+    CLOSING_SOON = "closing_date"
+
+
+class CategoryFacetSchema(BaseModel):
+    name: str
+    slug: str
+    count: int
+
+
+class PriceFacetSchema(BaseModel):
+    min: Decimal = Field(..., example=100.00, decimal_places=2)
+    max: Optional[Decimal] = Field(..., example=500.00, decimal_places=2)
+    count: int
+
+
+class ListingFacetsDataSchema(BaseModel):
+    categories: List[CategoryFacetSchema]
+    prices: List[PriceFacetSchema]
+
+
+class ListingFacetsResponseSchema(ResponseSchema):
+    data: ListingFacetsDataSchema
 
 
 # ------------------------------------------------------ #
@@ -165,4 +204,13 @@ class BidsResponseSchema(ResponseSchema):
     data: BidsResponseDataSchema
 
 
+class BidEventSchema(BaseModel):
+    # Sent by the bid stream, a "snapshot" of the top bids on connecting and a
+    # "bid" with the new bid whenever one is placed
+    event: str = Field(..., example="bid")
+    highest_bid: Decimal = Field(..., example=1000.00, decimal_places=2)
+    bids_count: int
+    bids: List[BidDataSchema]
+
+
 # -------------------------------------------- #
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from app.api.utils.auth import Authentication
+from app.common.cache import catalog_version, principal_cache
 from app.core.database import Base
 from app.db.managers.accounts import jwt_manager, user_manager
 from app.db.managers.listings import category_manager, listing_manager
@@ -48,6 +49,10 @@ async def setup_db(db_config):
     async with db_config.engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    # Tables are recreated behind the managers' back, so drop cached data too
+    catalog_version.bump()
+    category_manager.cache.clear()
+    principal_cache.clear()
 
 
 @pytest.fixture
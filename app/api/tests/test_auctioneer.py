@@ -1,8 +1,12 @@
+from starlite.utils import encode_json
+
 from app.db.managers.accounts import jwt_manager
-from app.db.managers.listings import category_manager, bid_manager
+from app.db.managers.listings import category_manager, bid_manager, listing_manager
+from app.api.schemas.listings import BidDataSchema
 from app.api.utils.auth import Authentication
 from datetime import datetime, timedelta
 from pytz import UTC
+import json
 
 BASE_URL_PATH = "/api/v3/auctioneer"
 
@@ -52,6 +56,43 @@ async def test_auctioneer_retrieve_listings(authorized_client, create_listing):
     assert any(isinstance(obj["name"], str) for obj in data)
 
 
+async def test_auctioneer_retrieve_listings_streamed(
+    mocker, authorized_client, create_listing, database
+):
+    listing = create_listing["listing"]
+    for idx in range(4):
+        await listing_manager.create(
+            database,
+            {
+                "auctioneer_id": listing.auctioneer_id,
+                "name": f"Streamed Listing {idx}",
+                "desc": "New description",
+                "price": 1000.00,
+                "closing_date": datetime.now() + timedelta(days=1),
+            },
+        )
+    mocker.patch("app.db.managers.listings.STREAM_CHUNK_SIZE", 2)
+
+    # Verify that unpaginated listings are streamed in chunks, newest first
+    response = await authorized_client.get(f"{BASE_URL_PATH}/listings")
+    assert response.status_code == 200
+    assert "content-length" not in response.headers
+    json_resp = response.json()
+    assert json_resp["next_cursor"] is None
+    names = [obj["name"] for obj in json_resp["data"]]
+    assert names == [f"Streamed Listing {idx}" for idx in range(3, -1, -1)] + [
+        listing.name
+    ]
+    assert all(obj["watchlist"] is None for obj in json_resp["data"])
+
+    # Verify that paginated listings still come in pages
+    response = await authorized_client.get(
+        f"{BASE_URL_PATH}/listings", params={"quantity": 2}
+    )
+    assert len(response.json()["data"]) == 2
+    assert response.json()["next_cursor"]
+
+
 async def test_auctioneer_create_listings(mocker, authorized_client, database):
     # Create Category
     await category_manager.create(database, {"name": "Test Category"})
@@ -188,6 +229,10 @@ async def test_auctioneer_listings_bids(
     assert json_resp["message"] == "Listing Bids fetched"
     data = json_resp["data"]
     assert isinstance(data["listing"], str)
+    bids = await bid_manager.get_by_listing_id(database, listing.id)
+    assert data["bids"] == [
+        json.loads(encode_json(BidDataSchema.from_orm(bid))) for bid in bids
+    ]
 
     # Verify that the auctioneer listing bids retrieval failed with invalid listing slug
     response = await authorized_client.get(
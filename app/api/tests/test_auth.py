@@ -1,5 +1,11 @@
 from app.db.managers.accounts import user_manager, jwt_manager, otp_manager
 from app.api.utils.auth import Authentication
+from app.api.utils.otps import OtpPurger
+from app.core.config import settings
+from app.core.security import HmacCodec, JoseCodec, password_hasher, pwd_context
+from datetime import datetime, timedelta
+from app.db.models.accounts import Otp, User
+from sqlalchemy import update
 
 BASE_URL_PATH = "/api/v3/auth"
 
@@ -49,6 +55,26 @@ async def test_verify_email(mocker, client, test_user, database):
         "status": "failure",
         "message": "Incorrect Otp",
     }
+    # Verify that the email verification fails with an expired otp
+    otp = await otp_manager.create(database, {"user_id": test_user.id})
+    await database.execute(
+        update(Otp)
+        .where(Otp.user_id == test_user.id)
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await database.commit()
+    response = await client.post(
+        f"{BASE_URL_PATH}/verify-email",
+        json={"email": test_user.email, "otp": otp.code},
+    )
+    assert response.status_code == 400
+    assert response.json() == {
+        "status": "failure",
+        "message": "Expired Otp",
+    }
+    # Verify that the expired otp is left for the purge, not burned by the attempt
+    assert await otp_manager.get_by_user_id(database, test_user.id)
+
     # Verify that the email verification succeeds with a valid otp
     otp = await otp_manager.create(database, {"user_id": test_user.id})
     mocker.patch("app.api.utils.emails.send_email", new="")
@@ -61,6 +87,8 @@ async def test_verify_email(mocker, client, test_user, database):
         "status": "success",
         "message": "Account verification successful",
     }
+    # Verify that the otp can't be used again
+    assert await otp_manager.get_by_user_id(database, test_user.id) is None
 
 
 async def test_resend_verification_email(mocker, client, test_user, database):
@@ -144,6 +172,41 @@ async def test_login(mocker, client, test_user, database):
         "data": {"access": mocker.ANY, "refresh": mocker.ANY},
     }
 
+    # Test for passwords hashed at another cost being rehashed at this one's
+    await database.execute(
+        update(User)
+        .where(User.id == test_user.id)
+        .values(
+            password=pwd_context.handler("bcrypt").using(rounds=4).hash("testpassword")
+        )
+    )
+    await database.commit()
+    response = await client.post(
+        f"{BASE_URL_PATH}/login",
+        json={"email": test_user.email, "password": "testpassword"},
+    )
+    assert response.status_code == 201
+    await database.refresh(test_user)
+    assert not test_user.password.startswith("$2b$04$")
+    assert not pwd_context.needs_update(test_user.password)
+    assert pwd_context.verify("testpassword", test_user.password)
+
+    # Test for logins turned down while the password hasher's queue is full
+    mocker.patch.object(
+        password_hasher,
+        "pending",
+        password_hasher.threads + password_hasher.queue_size,
+    )
+    response = await client.post(
+        f"{BASE_URL_PATH}/login",
+        json={"email": test_user.email, "password": "testpassword"},
+    )
+    assert response.status_code == 503
+    assert response.json() == {
+        "status": "failure",
+        "message": "Too many requests, try again shortly",
+    }
+
 
 async def test_refresh_token(mocker, client, database, verified_user):
     jwt_obj = await jwt_manager.create(
@@ -186,6 +249,31 @@ async def test_refresh_token(mocker, client, database, verified_user):
     }
 
 
+async def test_token_codecs(verified_user):
+    jose_codec = JoseCodec(settings.SECRET_KEY)
+    hmac_codec = HmacCodec(settings.SECRET_KEY, fallback=jose_codec)
+    expire = datetime.utcnow() + timedelta(minutes=5)
+    claims = {"exp": expire, "user_id": str(verified_user.id)}
+
+    # Tokens are the same whichever codec signs them, so sessions outlive a switch
+    token = hmac_codec.encode(claims)
+    assert token == jose_codec.encode(dict(claims))
+    assert hmac_codec.decode(token) == jose_codec.decode(token)
+    assert hmac_codec.decode(token)["user_id"] == str(verified_user.id)
+
+    # Forged, malformed and expired tokens are turned down
+    other_codec = HmacCodec("other-secret", fallback=JoseCodec("other-secret"))
+    assert hmac_codec.decode(other_codec.encode(claims)) is None
+    assert hmac_codec.decode(token[:-2]) is None
+    assert hmac_codec.decode("not-a-token") is None
+    expired = {**claims, "exp": datetime.utcnow() - timedelta(minutes=5)}
+    assert hmac_codec.decode(hmac_codec.encode(expired)) is None
+
+    # Claims it doesn't check itself are left to python-jose
+    not_yet = {**claims, "nbf": datetime.utcnow() + timedelta(minutes=5)}
+    assert hmac_codec.decode(hmac_codec.encode(not_yet)) is None
+
+
 async def test_get_password_otp(mocker, client, verified_user):
     email = verified_user.email
 
@@ -250,9 +338,24 @@ async def test_reset_password(mocker, client, verified_user, database):
         "message": "Incorrect Otp",
     }
 
-    # Verify that password reset succeeds
+    # Verify that the otp outlives a reset that fails to hash the new password
     otp = (await otp_manager.create(database, {"user_id": verified_user.id})).code
     password_reset_data["otp"] = otp
+    mocker.patch.object(
+        password_hasher,
+        "pending",
+        password_hasher.threads + password_hasher.queue_size,
+    )
+    response = await client.post(
+        f"{BASE_URL_PATH}/set-new-password",
+        json=password_reset_data,
+    )
+    assert response.status_code == 503
+    mocker.stopall()
+    database.expunge_all()
+    assert await otp_manager.get_by_user_id(database, verified_user.id)
+
+    # Verify that password reset succeeds, and uses the otp up
     mocker.patch("app.api.utils.emails.send_email", new="")
     response = await client.post(
         f"{BASE_URL_PATH}/set-new-password",
@@ -263,9 +366,40 @@ async def test_reset_password(mocker, client, verified_user, database):
         "status": "success",
         "message": "Password reset successful",
     }
+    assert await otp_manager.get_by_user_id(database, verified_user.id) is None
 
 
-async def test_logout(authorized_client):
+async def test_purge_expired_otps(test_user, verified_user, database, db_config):
+    # Re-issuing a code replaces the user's one and pushes its expiry back
+    otp = await otp_manager.create(database, {"user_id": test_user.id})
+    reissued = await otp_manager.create(database, {"user_id": test_user.id})
+    assert reissued.expires_at >= otp.expires_at
+    await otp_manager.create(database, {"user_id": verified_user.id})
+    await database.execute(
+        update(Otp)
+        .where(Otp.user_id == test_user.id)
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await database.commit()
+
+    # Verify that only expired codes are purged, a batch at a time
+    purger = OtpPurger(batch_size=1)
+    purger.engine = db_config.engine
+    assert await purger.purge() == 1
+    database.expunge_all()
+    assert await otp_manager.get_by_user_id(database, test_user.id) is None
+    assert await otp_manager.get_by_user_id(database, verified_user.id)
+    assert await purger.purge() == 0
+
+
+async def test_logout(mocker, authorized_client):
+    # Ensures the user behind a token is looked up once, then served from cache
+    get_by_user_id = mocker.spy(jwt_manager, "get_by_user_id")
+    for _ in range(2):
+        response = await authorized_client.get("/api/v3/auctioneer/")
+        assert response.status_code == 200
+    assert get_by_user_id.call_count == 1
+
     # Ensures if authorized user logs out successfully
     response = await authorized_client.get(f"{BASE_URL_PATH}/logout")
 
@@ -284,3 +418,7 @@ async def test_logout(authorized_client):
         "status": "failure",
         "message": "Auth Token is Invalid or Expired",
     }
+
+    # Ensures the logged out token no longer authenticates, cached or not
+    response = await authorized_client.get("/api/v3/auctioneer/")
+    assert response.status_code == 401
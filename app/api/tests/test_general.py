@@ -13,6 +13,14 @@ async def test_retrieve_sitedetail(client):
     keys = ["name", "email", "phone", "address", "fb", "tw", "wh", "ig"]
     assert all(item in json_resp["data"] for item in keys)
 
+    # Verify that unchanged site details get a 304
+    etag = response.headers["etag"]
+    response = await client.get(
+        f"{BASE_URL_PATH}/site-detail", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
 
 async def test_subscribe(client):
     # Check response validity
@@ -43,3 +51,16 @@ async def test_retrieve_reviews(client, verified_user, database, mocker):
         "message": "Reviews fetched",
         "data": [{"reviewer": mocker.ANY, "text": "This is a nice new platform"}],
     }
+
+    # Verify that unchanged reviews get a 304, and new ones a fresh response
+    etag = response.headers["etag"]
+    response = await client.get(
+        f"{BASE_URL_PATH}/reviews", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    await review_manager.create(database, {**review_dict, "text": "Another review"})
+    response = await client.get(
+        f"{BASE_URL_PATH}/reviews", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == 2
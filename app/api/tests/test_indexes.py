@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+
+from app.db.managers.accounts import jwt_manager, otp_manager, user_manager
+from app.db.managers.base import guestuser_manager
+from app.db.managers.general import review_manager
+from app.db.managers.listings import (
+    bid_entry_manager,
+    bid_manager,
+    listing_manager,
+    watchlist_manager,
+)
+import pytest
+
+LISTINGS_COUNT = 300
+
+
+@pytest.fixture
+async def seeded(create_listing, another_verified_user, database):
+    listing, user = create_listing["listing"], create_listing["user"]
+    guestuser = await guestuser_manager.create(database)
+    now = datetime.utcnow()
+    listing_ids = await listing_manager.bulk_create(
+        database,
+        [
+            {
+                "auctioneer_id": another_verified_user.id,
+                "name": f"Listing {idx}",
+                "slug": f"listing-{idx}",
+                "desc": "Seeded description",
+                "price": 100 + idx,
+                # Most of a catalog's listings are closed auctions
+                "active": idx < LISTINGS_COUNT // 10,
+                "closing_date": now
+                + timedelta(days=1 if idx < LISTINGS_COUNT // 10 else -1, minutes=idx),
+                "created_at": now - timedelta(seconds=idx),
+                "updated_at": now - timedelta(seconds=idx),
+            }
+            for idx in range(LISTINGS_COUNT)
+        ],
+    )
+    await bid_manager.bulk_create(
+        database,
+        [
+            {
+                "user_id": user.id,
+                "listing_id": listing_id,
+                "amount": 5000,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for listing_id in listing_ids
+        ],
+    )
+    await bid_entry_manager.bulk_create(
+        database,
+        [
+            {
+                "user_id": user.id,
+                "listing_id": listing_id,
+                "amount": 5000 + idx,
+                "created_at": now + timedelta(seconds=idx),
+                "updated_at": now + timedelta(seconds=idx),
+            }
+            for listing_id in listing_ids
+            for idx in range(3)
+        ],
+    )
+    await watchlist_manager.bulk_create(
+        database,
+        [
+            {"session_key": guestuser.id, "listing_id": listing_id}
+            for listing_id in listing_ids
+        ],
+    )
+    await review_manager.create(
+        database, {"reviewer_id": user.id, "show": True, "text": "Nice platform"}
+    )
+    await otp_manager.create(database, {"user_id": user.id})
+    user_ids = await user_manager.bulk_create(
+        database,
+        [
+            {
+                "first_name": "Seeded",
+                "last_name": f"User {idx}",
+                "email": f"seeded{idx}@example.com",
+                "password": "seededpassword",
+            }
+            for idx in range(LISTINGS_COUNT)
+        ],
+    )
+    await jwt_manager.bulk_create(
+        database,
+        [
+            {"user_id": user_id, "access": f"access{idx}", "refresh": f"refresh{idx}"}
+            for idx, user_id in enumerate([user.id, *user_ids])
+        ],
+    )
+    await database.execute(text("ANALYZE"))
+    return {"listing": listing, "user": user, "guestuser": guestuser}
+
+
+async def explain(db, queries):
+    # Sequential scans are disabled, so any table an index can't serve still
+    # shows up in the plan, as a costly 'Seq Scan'
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        await queries()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    conn = await db.connection()
+    await conn.exec_driver_sql("SET enable_seqscan = off")
+    plans = []
+    for statement, parameters in statements:
+        rows = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        plans.append("\n".join(row[0] for row in rows))
+    await conn.exec_driver_sql("RESET enable_seqscan")
+    return "\n".join(plans)
+
+
+async def test_manager_queries_use_indexes(seeded, database):
+    listing, user, guestuser = seeded["listing"], seeded["user"], seeded["guestuser"]
+
+    async def stream_bid_entries():
+        start = datetime.utcnow()
+        stream = bid_entry_manager.stream_between(database, start, start + timedelta(1))
+        async for _ in stream:
+            pass
+
+    queries = [
+        (
+            lambda: listing_manager.get_all(database, 20),
+            "ix_listings_created_at_id",
+        ),
+        (
+            lambda: listing_manager.get_all(database, 20, active=True),
+            "ix_listings_open_closing_date",
+        ),
+        (
+            lambda: listing_manager.close_due(database, 100),
+            "ix_listings_open_closing_date",
+        ),
+        (
+            lambda: listing_manager.get_all(database, 20, sort="-price"),
+            "ix_listings_price_created_at_id",
+        ),
+        (
+            lambda: listing_manager.get_all(database, 20, sort="closing_date"),
+            "ix_listings_closing_date_created_at_id",
+        ),
+        (
+            lambda: listing_manager.get_by_category(database, listing.category, 20),
+            "ix_listings_category_id_created_at_id",
+        ),
+        (
+            lambda: listing_manager.get_by_auctioneer_id(database, user.id, 20),
+            "ix_listings_auctioneer_id_created_at_id",
+        ),
+        (
+            lambda: listing_manager.get_by_slug(database, listing.slug),
+            "listings_slug_key",
+        ),
+        (
+            lambda: listing_manager.search(database, "seeded", quantity=20),
+            "ix_listings_search_vector",
+        ),
+        (
+            lambda: bid_manager.get_by_listing_id(database, listing.id, 3),
+            "ix_bids_listing_id_updated_at",
+        ),
+        (
+            lambda: bid_manager.get_by_user_id(database, user.id),
+            "unique_user_listing_bids",
+        ),
+        (
+            lambda: bid_entry_manager.get_by_listing_id(database, listing.id, 20),
+            "ix_bid_entries_listing_id_created_at",
+        ),
+        (stream_bid_entries, "ix_bid_entries_created_at"),
+        (
+            lambda: watchlist_manager.get_by_session_key(database, guestuser.id, None),
+            "unique_session_key_listing_watchlists",
+        ),
+        (
+            lambda: watchlist_manager.get_listing_ids_by_client_id(
+                database, guestuser.id, [listing.id]
+            ),
+            "unique_session_key_listing_watchlists",
+        ),
+        (
+            lambda: jwt_manager.get_by_user_id(database, user.id),
+            "jwts_user_id_key",
+        ),
+        (
+            lambda: jwt_manager.get_by_refresh(database, "refresh0"),
+            "jwts_refresh_digest_key",
+        ),
+        (lambda: otp_manager.get_by_user_id(database, user.id), "otps_user_id_key"),
+        (lambda: otp_manager.consume(database, user.id, 0), "otps_user_id_key"),
+        (lambda: otp_manager.purge_expired(database, 100), "ix_otps_expires_at"),
+        (lambda: review_manager.get_active(database), "ix_reviews_show"),
+    ]
+    for query, index in queries:
+        plan = await explain(database, query)
+        assert index in plan, plan
+        assert "Seq Scan" not in plan, plan
@@ -1,6 +1,29 @@
-from app.db.managers.accounts import jwt_manager
-from app.db.managers.listings import category_manager, watchlist_manager, bid_manager
+from starlite import TestClient
+from starlite.utils import encode_json
+
+from app.db.managers.accounts import jwt_manager, user_manager
+from app.db.managers.base import file_manager
+from app.db.managers.listings import (
+    category_manager,
+    listing_manager,
+    watchlist_manager,
+    bid_manager,
+    bid_entry_manager,
+    related_listing_manager,
+    LISTING_DISPLAY,
+)
+from app.api.schemas.listings import ListingDataSchema
+from app.api.utils.auctions import AuctionCloser
 from app.api.utils.auth import Authentication
+from app.api.utils.bids import SequencedListing, bid_sequencer, stream_bid_events
+from app.api.utils.broadcast import BIDS_CHANNEL, BidBroadcast, bid_broadcast
+from app.api.utils.feeds import Feed, feed_cache
+from app.api.utils.pagination import decode_cursor, paginate, sort_key
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+import asyncio, json, pytest, random
 
 BASE_URL_PATH = "/api/v3/listings"
 
@@ -17,6 +40,362 @@ async def test_retrieve_all_listings(client, create_listing):
     assert any(isinstance(obj["name"], str) for obj in data)
 
 
+async def test_retrieve_all_listings_paginated(client, create_listing, database):
+    listing = create_listing["listing"]
+    newer_listing = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Newer Listing",
+            "desc": "Newer description",
+            "price": 1000.00,
+            "closing_date": listing.closing_date,
+        },
+    )
+
+    # Verify that the first page holds the newest listing and a cursor
+    response = await client.get(BASE_URL_PATH, params={"quantity": 1})
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [newer_listing.slug]
+    assert json_resp["next_cursor"]
+
+    # Verify that the cursor fetches the next and last page
+    response = await client.get(
+        BASE_URL_PATH, params={"quantity": 1, "cursor": json_resp["next_cursor"]}
+    )
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [listing.slug]
+    assert json_resp["next_cursor"] is None
+
+    # Verify that a quantity of 0 still returns every listing
+    response = await client.get(BASE_URL_PATH, params={"quantity": 0})
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert len(json_resp["data"]) == 2
+    assert json_resp["next_cursor"] is None
+
+    # Verify that an invalid cursor fails
+    response = await client.get(BASE_URL_PATH, params={"cursor": "invalid"})
+    assert response.status_code == 400
+    assert response.json() == {"status": "failure", "message": "Invalid cursor"}
+
+
+async def test_retrieve_all_listings_watchlist_flag(
+    authorized_client, create_listing, database
+):
+    listing = create_listing["listing"]
+    await watchlist_manager.create(
+        database, {"user_id": create_listing["user"].id, "listing_id": listing.id}
+    )
+
+    # Verify that listings in the client's watchlist are flagged
+    response = await authorized_client.get(BASE_URL_PATH)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [obj["watchlist"] for obj in data if obj["slug"] == listing.slug] == [True]
+
+
+async def test_retrieve_all_listings_cached(
+    authorized_client, create_listing, database
+):
+    listing = create_listing["listing"]
+
+    # Verify that the first request caches the shared feed
+    response = await authorized_client.get(BASE_URL_PATH, headers={"Authorization": ""})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert set(data[0]) == set(ListingDataSchema.__fields__)
+    assert data[0]["watchlist"] is False
+
+    # Verify that a cached feed still shows the client's own watchlist
+    await watchlist_manager.create(
+        database, {"user_id": create_listing["user"].id, "listing_id": listing.id}
+    )
+    response = await authorized_client.get(BASE_URL_PATH)
+    assert response.json()["data"][0]["watchlist"] is True
+
+    # Verify that listing updates invalidate the cached feed
+    await listing_manager.update(database, listing, {"name": "Renamed Listing"})
+    response = await authorized_client.get(BASE_URL_PATH)
+    assert response.json()["data"][0]["name"] == "Renamed Listing"
+
+
+async def test_retrieve_all_listings_match_schema(client, create_listing, database):
+    listing, user = create_listing["listing"], create_listing["user"]
+    avatar = await file_manager.create(database, {"resource_type": "image/png"})
+    await user_manager.update(database, user, {"avatar_id": avatar.id})
+    listing = await listing_manager.get_by_slug(database, listing.slug, LISTING_DISPLAY)
+
+    # Verify that listings rendered from the column projection match the schema
+    response = await client.get(BASE_URL_PATH)
+    assert response.status_code == 200
+    data = response.json()["data"][0]
+    expected = ListingDataSchema(
+        time_left_seconds=listing.time_left_seconds, watchlist=False, **listing.dict()
+    )
+    expected = json.loads(encode_json(expected))
+    assert data["auctioneer"]["avatar"]
+    data.pop("time_left_seconds"), expected.pop("time_left_seconds")
+    assert data == expected
+
+
+async def test_retrieve_all_listings_not_modified(
+    mocker, authorized_client, create_listing, database
+):
+    listing = create_listing["listing"]
+    response = await authorized_client.get(BASE_URL_PATH)
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    # Verify that a current ETag gets a bodiless 304, straight from the feed cache
+    get_all = mocker.spy(listing_manager, "get_all")
+    response = await authorized_client.get(
+        BASE_URL_PATH, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert get_all.call_count == 0
+
+    # Verify that a feed rebuilt from the same rows (after its cache entry expired,
+    # or on another worker) keeps the ETag
+    feed_cache.clear()
+    response = await authorized_client.get(
+        BASE_URL_PATH, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert get_all.call_count == 1
+    rows = await listing_manager.get_all(database, projected=True)
+    assert Feed(rows, None).version == Feed(rows, None).version
+
+    # Verify that watching a listing or updating it changes the ETag
+    await watchlist_manager.create(
+        database, {"user_id": create_listing["user"].id, "listing_id": listing.id}
+    )
+    response = await authorized_client.get(
+        BASE_URL_PATH, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    etag = response.headers["etag"]
+
+    await listing_manager.update(database, listing, {"price": 2000.00})
+    response = await authorized_client.get(
+        BASE_URL_PATH, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"][0]["price"] == "2000.00"
+
+
+async def test_retrieve_all_listings_compressed(client, create_listing, database):
+    listing = create_listing["listing"]
+    for idx in range(5):
+        await listing_manager.create(
+            database,
+            {
+                "auctioneer_id": listing.auctioneer_id,
+                "name": f"Compressed Listing {idx}",
+                "desc": "New description",
+                "price": 1000.00,
+                "closing_date": datetime.now() + timedelta(days=1),
+            },
+        )
+
+    # Verify that large bodies are compressed, brotli first, and keep a weak ETag
+    response = await client.get(BASE_URL_PATH, headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    response = await client.get(BASE_URL_PATH, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith('W/"')
+    assert len(response.json()["data"]) == 6
+
+
+async def test_retrieve_all_listings_sorted_and_filtered(
+    client, create_listing, database
+):
+    listing = create_listing["listing"]
+    cheaper_listing = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Cheaper Listing",
+            "desc": "Cheaper description",
+            "price": 200.00,
+            "closing_date": datetime.utcnow() + timedelta(hours=2),
+        },
+    )
+
+    # Verify that listings are sorted and paginated by the sort key
+    response = await client.get(BASE_URL_PATH, params={"sort": "price", "quantity": 1})
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [cheaper_listing.slug]
+    cursor = json_resp["next_cursor"]
+    response = await client.get(
+        BASE_URL_PATH, params={"sort": "price", "quantity": 1, "cursor": cursor}
+    )
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [listing.slug]
+    assert json_resp["next_cursor"] is None
+
+    # Verify that a cursor of another sort order fails
+    response = await client.get(
+        BASE_URL_PATH, params={"sort": "-bids_count", "cursor": cursor}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"status": "failure", "message": "Invalid cursor"}
+
+    # Verify that listings are filtered
+    for params, slugs in (
+        ({"max_price": 500}, [cheaper_listing.slug]),
+        ({"closing_within_hours": 3}, [cheaper_listing.slug]),
+        ({"active": True, "sort": "-price"}, [listing.slug, cheaper_listing.slug]),
+    ):
+        response = await client.get(BASE_URL_PATH, params=params)
+        assert [obj["slug"] for obj in response.json()["data"]] == slugs
+
+    # Verify that an invalid sort key fails
+    response = await client.get(BASE_URL_PATH, params={"sort": "invalid"})
+    assert response.status_code == 422
+
+
+async def test_retrieve_all_listings_sorted_by_closing_date(create_listing, database):
+    listing = create_listing["listing"]
+    open_ended = [
+        await listing_manager.create(
+            database,
+            {
+                "auctioneer_id": listing.auctioneer_id,
+                "name": f"Open Ended Listing {idx}",
+                "desc": "Open ended description",
+                "price": 1000.00,
+            },
+        )
+        for idx in range(2)
+    ]
+    newest_first = [open_ended[1].slug, open_ended[0].slug]
+
+    # Verify that listings without a closing date are paged through, last when
+    # closing soonest first and first when closing last first
+    for sort, slugs in (
+        ("closing_date", [listing.slug, *newest_first[::-1]]),
+        ("-closing_date", [*newest_first, listing.slug]),
+    ):
+        pages, cursor = [], None
+        while True:
+            listings = await listing_manager.get_all(
+                database, 1, decode_cursor(cursor, sort_key(sort)), sort, load=()
+            )
+            listings, cursor = paginate(listings, 1, sort)
+            pages.extend(obj.slug for obj in listings)
+            if not cursor:
+                break
+        assert pages == slugs
+
+
+async def test_retrieve_listing_facets(client, create_listing, database):
+    listing = create_listing["listing"]
+    await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Uncategorized Listing",
+            "desc": "Uncategorized description",
+            "price": 200.00,
+            "closing_date": listing.closing_date,
+        },
+    )
+
+    # Verify that listings are counted per category and price range
+    response = await client.get(f"{BASE_URL_PATH}/facets")
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert json_resp["message"] == "Listing facets fetched"
+    assert sorted(json_resp["data"]["categories"], key=lambda obj: obj["slug"]) == [
+        {"name": "Other", "slug": "other", "count": 1},
+        {"name": "TestCategory", "slug": create_listing["category"].slug, "count": 1},
+    ]
+    assert json_resp["data"]["prices"] == [
+        {"min": "100", "max": "500", "count": 1},
+        {"min": "1000", "max": "5000", "count": 1},
+    ]
+
+    # Verify that facets are filtered
+    response = await client.get(f"{BASE_URL_PATH}/facets", params={"max_price": 500})
+    assert response.json()["data"]["prices"] == [
+        {"min": "100", "max": "500", "count": 1}
+    ]
+
+
+async def test_search_listings(client, create_listing, database):
+    listing = create_listing["listing"]
+    camera = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Vintage Camera",
+            "desc": "A camera in mint condition",
+            "price": 500.00,
+            "closing_date": listing.closing_date,
+        },
+    )
+    lens = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Zoom Lens",
+            "desc": "Fits any vintage camera",
+            "category_id": listing.category_id,
+            "price": 2000.00,
+            "closing_date": listing.closing_date,
+        },
+    )
+
+    # Verify that matches in the name rank above matches in the description
+    response = await client.get(f"{BASE_URL_PATH}/search", params={"q": "cameras"})
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert json_resp["message"] == "Listings fetched"
+    assert [obj["slug"] for obj in json_resp["data"]] == [camera.slug, lens.slug]
+
+    # Verify that results are paginated with a cursor
+    response = await client.get(
+        f"{BASE_URL_PATH}/search", params={"q": "camera", "quantity": 1}
+    )
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [camera.slug]
+    response = await client.get(
+        f"{BASE_URL_PATH}/search",
+        params={"q": "camera", "quantity": 1, "cursor": json_resp["next_cursor"]},
+    )
+    json_resp = response.json()
+    assert [obj["slug"] for obj in json_resp["data"]] == [lens.slug]
+    assert json_resp["next_cursor"] is None
+
+    # Verify that results are filtered
+    category_slug = create_listing["category"].slug
+    for params, slugs in (
+        ({"category": category_slug}, [lens.slug]),
+        ({"category": "other"}, [camera.slug]),
+        ({"min_price": 1000}, [lens.slug]),
+        ({"max_price": 1000}, [camera.slug]),
+        ({"active": False}, []),
+    ):
+        response = await client.get(
+            f"{BASE_URL_PATH}/search", params={"q": "camera", **params}
+        )
+        assert [obj["slug"] for obj in response.json()["data"]] == slugs
+
+    # Verify that an invalid category fails
+    response = await client.get(
+        f"{BASE_URL_PATH}/search", params={"q": "camera", "category": "invalid"}
+    )
+    assert response.status_code == 404
+    assert response.json() == {"status": "failure", "message": "Invalid category"}
+
+
 async def test_retrieve_particular_listng(mocker, client, create_listing):
     listing = create_listing["listing"]
 
@@ -55,6 +434,32 @@ async def test_retrieve_particular_listng(mocker, client, create_listing):
     }
 
 
+async def test_retrieve_related_listings(client, create_listing, database):
+    listing = create_listing["listing"]
+    related_listing = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Related Listing",
+            "desc": "Related description",
+            "category_id": listing.category_id,
+            "price": 1000.00,
+            "closing_date": listing.closing_date,
+        },
+    )
+
+    # Verify that listings in the same category are related
+    response = await client.get(f"{BASE_URL_PATH}/detail/{listing.slug}")
+    assert response.status_code == 200
+    related_listings = response.json()["data"]["related_listings"]
+    assert [obj["slug"] for obj in related_listings] == [related_listing.slug]
+
+    # Verify that a listing moved out of the category is no longer related
+    await listing_manager.update(database, related_listing, {"category_id": None})
+    response = await client.get(f"{BASE_URL_PATH}/detail/{listing.slug}")
+    assert response.json()["data"]["related_listings"] == []
+
+
 async def test_get_user_watchlists_listng(authorized_client, create_listing, database):
     listing = create_listing["listing"]
     user_id = create_listing["user"].id
@@ -113,6 +518,48 @@ async def test_retrieve_all_categories(client, database):
     assert len(data) > 0
     assert any(isinstance(obj["name"], str) for obj in data)
 
+    # Verify that unchanged categories get a 304
+    response = await client.get(
+        f"{BASE_URL_PATH}/categories",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+async def test_retrieve_all_categories_cached(client, database):
+    category = await category_manager.create(database, {"name": "TestCategory"})
+    response = await client.get(f"{BASE_URL_PATH}/categories")
+    assert [obj["name"] for obj in response.json()["data"]] == ["TestCategory"]
+
+    # Verify that category writes invalidate the cached categories
+    await category_manager.update(database, category, {"name": "Renamed Category"})
+    await category_manager.create(database, {"name": "AnotherCategory"})
+    response = await client.get(f"{BASE_URL_PATH}/categories")
+    names = [obj["name"] for obj in response.json()["data"]]
+    assert sorted(names) == ["AnotherCategory", "Renamed Category"]
+
+    # Verify that slugs resolve through the cache
+    response = await client.get(f"{BASE_URL_PATH}/categories/{category.slug}")
+    assert response.status_code == 200
+
+    await category_manager.delete(database, category)
+    response = await client.get(f"{BASE_URL_PATH}/categories/{category.slug}")
+    assert response.status_code == 404
+
+
+async def test_category_writes_refresh_feeds(client, create_listing, database):
+    category = create_listing["category"]
+    response = await client.get(BASE_URL_PATH)
+    assert response.json()["data"][0]["category"] == category.name
+
+    # Verify that a renamed category shows in cached feeds and changes their ETag
+    await category_manager.update(database, category, {"name": "Renamed Category"})
+    renamed = await client.get(
+        BASE_URL_PATH, headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert renamed.status_code == 200
+    assert renamed.json()["data"][0]["category"] == "Renamed Category"
+
 
 async def test_retrieve_all_listings_by_category(client, create_listing):
     slug = create_listing["category"].slug
@@ -211,6 +658,12 @@ async def test_create_bid(
         "message": "Bid amount cannot be less than the bidding price!",
     }
 
+    # Load the listing's (still empty) bids so the new bid is pushed to the cache
+    response = await authorized_client.get(
+        f"{BASE_URL_PATH}/detail/{listing.slug}/bids"
+    )
+    assert response.json()["data"]["bids"] == []
+
     # Verify that the bid was created successfully
     response = await authorized_client.post(
         f"{BASE_URL_PATH}/detail/{listing.slug}/bids", json={"amount": 10000}
@@ -227,4 +680,280 @@ async def test_create_bid(
         },
     }
 
+    # Verify that the new bid is served by the listing bids endpoint
+    response = await authorized_client.get(
+        f"{BASE_URL_PATH}/detail/{listing.slug}/bids"
+    )
+    assert response.status_code == 200
+    assert [bid["amount"] for bid in response.json()["data"]["bids"]] == ["10000.00"]
+
+    # Verify that a raised bid replaces the user's current bid, while the ledger
+    # keeps both
+    response = await authorized_client.post(
+        f"{BASE_URL_PATH}/detail/{listing.slug}/bids", json={"amount": 12000}
+    )
+    assert response.status_code == 201
+    response = await authorized_client.get(
+        f"{BASE_URL_PATH}/detail/{listing.slug}/bids"
+    )
+    assert [bid["amount"] for bid in response.json()["data"]["bids"]] == ["12000.00"]
+    entries = await bid_entry_manager.get_by_listing_id(database, listing.id)
+    assert [(entry.user_id, entry.amount) for entry in entries] == [
+        (another_verified_user.id, Decimal("12000.00")),
+        (another_verified_user.id, Decimal("10000.00")),
+    ]
+
+    # Verify that a bid beaten in a live queue on the listing is still turned down
+    # for the listing's state first
+    await listing_manager.update(database, listing, {"active": False})
+    queued = bid_sequencer.listings[listing.slug] = SequencedListing()
+    queued.floor = Decimal(12000)
+    try:
+        response = await authorized_client.post(
+            f"{BASE_URL_PATH}/detail/{listing.slug}/bids", json={"amount": 11000}
+        )
+    finally:
+        del bid_sequencer.listings[listing.slug]
+    assert response.status_code == 410
+    assert response.json() == {
+        "status": "failure",
+        "message": "This auction is closed!",
+    }
+
     # You can also test for other error responses.....
+
+
+async def test_stream_listing_bids(
+    client, create_listing, another_verified_user, database, db_config
+):
+    listing = create_listing["listing"]
+
+    # Verify that streaming an invalid listing's bids fails
+    response = await client.get(f"{BASE_URL_PATH}/detail/invalid_slug/bids/events")
+    assert response.status_code == 404
+    assert response.json() == {
+        "status": "failure",
+        "message": "Listing does not exist!",
+    }
+
+    # Verify that the stream starts with a snapshot of the listing's top bids
+    events = stream_bid_events(db_config.engine, listing.slug)
+    assert json.loads(await events.__anext__()) == {
+        "event": "snapshot",
+        "highest_bid": "0.00",
+        "bids_count": 0,
+        "bids": [],
+    }
+
+    # Verify that a placed bid is pushed to the stream
+    access = await Authentication.create_access_token(
+        {"user_id": str(another_verified_user.id)}
+    )
+    await jwt_manager.create(
+        database,
+        {"user_id": another_verified_user.id, "access": access, "refresh": "refresh"},
+    )
+    response = await client.post(
+        f"{BASE_URL_PATH}/detail/{listing.slug}/bids",
+        json={"amount": 10000},
+        headers={"Authorization": f"Bearer {access}"},
+    )
+    assert json.loads(await events.__anext__()) == {
+        "event": "bid",
+        "highest_bid": "10000.00",
+        "bids_count": 1,
+        "bids": [response.json()["data"]],
+    }
+    await events.aclose()
+    assert not bid_broadcast.subscribers
+
+    # Verify that bids placed through other workers reach the stream through the
+    # bridge, once it's listening
+    broadcast = BidBroadcast()
+    broadcast.start(db_config.engine)
+    try:
+        await asyncio.wait_for(broadcast.listening.wait(), 10)
+        async with broadcast.subscribe(listing.slug) as queue:
+            payload = json.dumps(
+                {"origin": "another-worker", "slug": listing.slug, "message": "event"}
+            )
+            await database.execute(select(func.pg_notify(BIDS_CHANNEL, payload)))
+            await database.commit()
+            assert await asyncio.wait_for(queue.get(), 10) == "event"
+    finally:
+        await broadcast.stop()
+
+
+async def test_stream_listing_bids_endpoints(
+    app, create_listing, another_verified_user, database
+):
+    listing = create_listing["listing"]
+    url = f"{BASE_URL_PATH}/detail/{listing.slug}/bids"
+    access = await Authentication.create_access_token(
+        {"user_id": str(another_verified_user.id)}
+    )
+    await jwt_manager.create(
+        database,
+        {"user_id": another_verified_user.id, "access": access, "refresh": "refresh"},
+    )
+
+    # One client for the socket and the bid, so both are served by the same loop
+    with TestClient(app=app) as client:
+        # Verify that the WebSocket sends the snapshot, then each bid placed
+        with client.websocket_connect(f"{url}/stream") as socket:
+            assert json.loads(socket.receive_text())["event"] == "snapshot"
+            response = client.post(
+                url,
+                json={"amount": 10000},
+                headers={"Authorization": f"Bearer {access}"},
+            )
+            assert response.status_code == 201
+            assert json.loads(socket.receive_text()) == {
+                "event": "bid",
+                "highest_bid": "10000.00",
+                "bids_count": 1,
+                "bids": [response.json()["data"]],
+            }
+
+        # Verify that a closed auction's event stream ends after its snapshot
+        await listing_manager.update(database, listing, {"active": False})
+        response = client.get(f"{url}/events")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        prefix, event = response.text.split("data: ")
+        assert prefix == "" and event.endswith("\n\n")
+        event = json.loads(event)
+        assert (event["event"], event["highest_bid"]) == ("snapshot", "10000.00")
+        assert [bid["amount"] for bid in event["bids"]] == ["10000.00"]
+
+
+@pytest.mark.parametrize("sequenced", [False, True])
+async def test_create_bid_concurrently(
+    sequenced, create_listing, database, db_config, mocker
+):
+    listing = create_listing["listing"]
+    user_ids = await user_manager.bulk_create(
+        database,
+        [
+            {
+                "first_name": "Bidder",
+                "last_name": str(i),
+                "email": f"bidder{i}@example.com",
+                "password": "bidderpassword",
+            }
+            for i in range(300)
+        ],
+    )
+
+    # Every bidder places two bids at once, amounts collide across bidders and
+    # arrive out of order. The test client handles requests one at a time, so
+    # bids are placed through the manager, each in its own session, or through
+    # the sequencer as create_bid does.
+    rng = random.Random(0)
+    attempts = [
+        (user_id, Decimal(1000 + rng.randint(1, 200)))
+        for user_id in user_ids
+        for _ in range(2)
+    ]
+    SessionLocal = async_sessionmaker(bind=db_config.engine, expire_on_commit=False)
+
+    place_many = mocker.spy(bid_manager, "place_many")
+
+    async def place(user_id, amount):
+        async with SessionLocal() as db:
+            if sequenced:
+                return await bid_sequencer.place(db, listing.slug, user_id, amount)
+            return await bid_manager.place(db, listing.slug, user_id, amount)
+
+    results = await asyncio.gather(*(place(*attempt) for attempt in attempts))
+
+    # Verify that the listing holds the highest bid and counts each bidder once
+    placed = {}
+    for (user_id, amount), bid in zip(attempts, results):
+        if bid:
+            placed.setdefault(user_id, []).append(amount)
+    database.expunge_all()
+    listing = await listing_manager.get_by_id(database, listing.id)
+    bids = await bid_manager.get_by_listing_id(database, listing.id, load=())
+    assert listing.highest_bid == max(amount for _, amount in attempts)
+    assert listing.bids_count == len(bids) == len(placed)
+    assert {bid.user_id: bid.amount for bid in bids} == {
+        user_id: max(amounts) for user_id, amounts in placed.items()
+    }
+
+    # Verify that bids were stamped in the order they were placed
+    amounts = [bid.amount for bid in bids]
+    assert amounts == sorted(amounts, reverse=True)
+
+    # Verify that the ledger holds every placed bid, in the order placed
+    entries = await bid_entry_manager.get_by_listing_id(database, listing.id)
+    assert sorted(entry.amount for entry in entries) == sorted(
+        amount for amounts in placed.values() for amount in amounts
+    )
+    amounts = [entry.amount for entry in entries]
+    assert amounts == sorted(amounts, reverse=True)
+
+    # Verify that the sequencer placed queued bids in batches and let go of them
+    assert bool(place_many.call_count) == sequenced
+    assert not bid_sequencer.listings
+
+
+async def test_close_listings(
+    create_listing, verified_user, another_verified_user, database, db_config
+):
+    listing = create_listing["listing"]
+    expired_listing = await listing_manager.create(
+        database,
+        {
+            "auctioneer_id": listing.auctioneer_id,
+            "name": "Expired Listing",
+            "desc": "Expired description",
+            "category_id": listing.category_id,
+            "price": 1000.00,
+            "closing_date": datetime.utcnow() - timedelta(minutes=1),
+        },
+    )
+    for user, amount in ((verified_user, 2000), (another_verified_user, 3000)):
+        await bid_manager.create(
+            database,
+            {"user_id": user.id, "listing_id": expired_listing.id, "amount": amount},
+        )
+
+    # Verify that expired listings are closed with their highest bidder as winner
+    closed = await listing_manager.close_due(database, 100)
+    assert [(row.slug, row.winner_id) for row in closed] == [
+        (expired_listing.slug, another_verified_user.id)
+    ]
+    database.expunge_all()
+    expired_listing = await listing_manager.get_by_id(database, expired_listing.id)
+    assert not expired_listing.active
+    assert expired_listing.winner_id == another_verified_user.id
+    listing = await listing_manager.get_by_id(database, listing.id)
+    assert listing.active
+
+    # Verify that closed listings are no longer related to open ones
+    related_listings = await related_listing_manager.get_related_listings(
+        database, listing
+    )
+    assert related_listings == []
+    assert await listing_manager.close_due(database, 100) == []
+
+    # Verify that the closer closes a scheduled listing on time and tells its
+    # subscribers
+    closer = AuctionCloser(refresh_seconds=1)
+    closer.start(db_config.engine)
+    async with bid_broadcast.subscribe(listing.slug) as queue:
+        closing_date = datetime.utcnow() + timedelta(milliseconds=300)
+        await listing_manager.update(database, listing, {"closing_date": closing_date})
+        closer.schedule(closing_date)
+        message = await asyncio.wait_for(queue.get(), 5)
+    await closer.stop()
+    assert json.loads(message) == {
+        "event": "closed",
+        "highest_bid": "0.00",
+        "bids_count": 0,
+        "bids": [],
+    }
+    database.expunge_all()
+    listing = await listing_manager.get_by_id(database, listing.id)
+    assert not listing.active and listing.winner_id is None
@@ -0,0 +1,115 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+import asyncio, heapq, logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.api.schemas.listings import BidEventSchema
+from app.api.utils.bids import render_bid_event
+from app.api.utils.broadcast import bid_broadcast
+from app.core.config import settings
+from app.db.managers.listings import listing_manager
+from app.db.models.listings import Listing
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionCloser:
+    """
+    Closes listings as their closing dates pass. The closing dates due before the
+    next refresh are loaded into a heap, and the task sleeps until the earliest
+    of them to close every listing due by then in batches (see
+    ListingManager.close_due), publishing a "closed" event to each one's bid
+    stream. Listings created or rescheduled in between are pushed by their routes
+    through `schedule`. Closing only takes listings still open and due, so every
+    worker runs a closer of its own.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.AUCTION_CLOSING_BATCH_SIZE,
+        refresh_seconds: int = settings.AUCTION_CLOSING_REFRESH_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.refresh_seconds = refresh_seconds
+        self.heap: List[datetime] = []
+        self.horizon = datetime.min
+        self.scheduled: Optional[asyncio.Event] = None
+        self.engine: Optional[AsyncEngine] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def schedule(self, closing_date: datetime):
+        # Later closing dates are picked up by a refresh
+        if self.task and closing_date < self.horizon:
+            heapq.heappush(self.heap, closing_date)
+            self.scheduled.set()
+
+    async def refresh(self):
+        self.horizon = datetime.utcnow() + timedelta(seconds=self.refresh_seconds)
+        async with AsyncSession(self.engine) as db:
+            closing_dates = (
+                await db.execute(
+                    select(Listing.closing_date).where(
+                        Listing.active, Listing.closing_date < self.horizon
+                    )
+                )
+            ).scalars()
+            self.heap = list(closing_dates)
+        heapq.heapify(self.heap)
+
+    async def close_due(self):
+        async with AsyncSession(self.engine, expire_on_commit=False) as db:
+            while True:
+                closed = await listing_manager.close_due(db, self.batch_size)
+                for listing in closed:
+                    event = BidEventSchema(
+                        event="closed",
+                        highest_bid=listing.highest_bid,
+                        bids_count=listing.bids_count,
+                        bids=[],
+                    )
+                    bid_broadcast.publish(listing.slug, render_bid_event(event))
+                if len(closed) < self.batch_size:
+                    break
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+                while True:
+                    now = datetime.utcnow()
+                    if self.heap and self.heap[0] <= now:
+                        while self.heap and self.heap[0] <= now:
+                            heapq.heappop(self.heap)
+                        await self.close_due()
+                        continue
+                    if now >= self.horizon:
+                        break
+                    wake_at = (
+                        min(self.heap[0], self.horizon) if self.heap else self.horizon
+                    )
+                    self.scheduled.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self.scheduled.wait(), (wake_at - now).total_seconds()
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+            except Exception:
+                logger.exception("Closing due auctions failed")
+                await asyncio.sleep(self.refresh_seconds)
+
+    def start(self, engine: AsyncEngine):
+        self.engine = engine
+        self.scheduled = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+auction_closer = AuctionCloser()
@@ -3,12 +3,10 @@ import random
 import string
 from datetime import datetime, timedelta
 
-from jose import jwt
-
+from app.common.cache import principal_cache
 from app.core.config import settings
-from app.db.managers.accounts import jwt_manager
-
-ALGORITHM = "HS256"
+from app.core.security import token_codec
+from app.db.managers.accounts import JWT_USER, jwt_manager
 
 
 class Authentication:
@@ -22,7 +20,7 @@ class Authentication:
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
         to_encode = {"exp": expire, **payload}
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = token_codec.encode(to_encode)
         return encoded_jwt
 
     # generate random refresh token
@@ -30,25 +28,28 @@ class Authentication:
         expire=datetime.utcnow()
         + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
     ):
-        return jwt.encode(
-            {"exp": expire, "data": Authentication.get_random(10)},
-            settings.SECRET_KEY,
-            algorithm=ALGORITHM,
+        return token_codec.encode(
+            {"exp": expire, "data": Authentication.get_random(10)}
         )
 
     # deocde access token from header
     async def decode_jwt(token: str):
-        try:
-            decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        except:
-            decoded = False
-        return decoded
+        decoded = token_codec.decode(token)
+        return decoded or False
 
     async def decodeAuthorization(db: AsyncSession, token: str):
+        # Cached users are detached, each request gets its own copy of them
+        user = principal_cache.get(token)
+        if user:
+            return await db.merge(user, load=False)
+
         decoded = await Authentication.decode_jwt(token[7:])
         if not decoded:
             return None
-        jwt_obj = await jwt_manager.get_by_user_id(db, decoded["user_id"])
+        jwt_obj = await jwt_manager.get_by_user_id(db, decoded["user_id"], JWT_USER)
         if not jwt_obj:
             return None
-        return jwt_obj.user
+        user = jwt_obj.user
+        db.expunge(user)
+        principal_cache.set(token, user, decoded["exp"])
+        return await db.merge(user, load=False)
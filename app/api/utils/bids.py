@@ -0,0 +1,188 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from decimal import Decimal
+from uuid import UUID
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlite.utils import encode_json
+
+from app.api.schemas.listings import BidDataSchema, BidEventSchema
+from app.api.utils.broadcast import bid_broadcast
+from app.common.cache import LRUCache
+from app.db.managers.listings import PlacedBid, bid_manager, listing_manager
+from app.db.models.listings import Listing
+
+TOP_BIDS_COUNT = 3
+# Most bids on a listing placed in one transaction
+BID_BATCH_SIZE = 100
+# Seconds a bid stream waits for an event before sending a keep-alive
+STREAM_KEEPALIVE = 15
+
+
+class TopBidsCache:
+    # Keeps the latest (and so highest) bids of recently viewed or bid on listings.
+    # Entries are tagged with the listing's highest bid and bids count, so bids
+    # placed through another worker turn them into misses.
+    def __init__(self, maxsize: int = 1024):
+        self.cache = LRUCache(maxsize)
+
+    @staticmethod
+    def version(listing: Listing) -> Tuple[Decimal, int]:
+        return listing.highest_bid, listing.bids_count
+
+    def get(self, listing: Listing) -> Optional[List[BidDataSchema]]:
+        entry = self.cache.get(listing.id)
+        if not entry or entry[0] != self.version(listing):
+            return None
+        return [bid for _, bid in entry[1]]
+
+    def set(self, listing: Listing, bids: List[Tuple[UUID, BidDataSchema]]):
+        self.cache.set(listing.id, (self.version(listing), bids[:TOP_BIDS_COUNT]))
+
+    async def fetch(self, db: AsyncSession, listing: Listing) -> List[BidDataSchema]:
+        bids = self.get(listing)
+        if bids is None:
+            bids = await bid_manager.get_by_listing_id(db, listing.id, TOP_BIDS_COUNT)
+            bids = [(bid.user_id, BidDataSchema.from_orm(bid)) for bid in bids]
+            self.set(listing, bids)
+            bids = [bid for _, bid in bids]
+        return bids
+
+    def push(
+        self,
+        listing_id: UUID,
+        previous_version: Tuple[Decimal, int],
+        version: Tuple[Decimal, int],
+        user_id: UUID,
+        bid: BidDataSchema,
+    ):
+        entry = self.cache.get(listing_id)
+        if not entry or entry[0] != previous_version:
+            # Can't be updated incrementally, the next read reloads it
+            self.cache.delete(listing_id)
+            return
+        # A user holds a single bid per listing
+        bids = [(user_id, bid)] + [item for item in entry[1] if item[0] != user_id]
+        self.cache.set(listing_id, (version, bids[:TOP_BIDS_COUNT]))
+
+
+class SequencedListing:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        # The highest bid placed through this worker, later bids have to beat it
+        self.floor = Decimal(0)
+
+
+class BidSequencer:
+    """
+    Funnels the bids a worker receives on a listing through a queue of its own,
+    drained by a single task. While one batch of bids holds the listing's row lock,
+    the next queues up in order and is placed in one transaction (see
+    BidManager.place_many), and bids already beaten are turned down without
+    reaching the database. A listing's queue is dropped once it runs dry.
+    """
+
+    def __init__(self, batch_size: int = BID_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.listings: Dict[str, SequencedListing] = {}
+
+    def beaten(self, slug: str, amount: Decimal) -> bool:
+        listing = self.listings.get(slug)
+        return bool(listing) and amount <= listing.floor
+
+    async def place(
+        self, db: AsyncSession, slug: str, user_id: UUID, amount: Decimal
+    ) -> Optional[PlacedBid]:
+        # Keyed by slug, which is all create_bid knows of the listing up front
+        if self.beaten(slug, amount):
+            return None
+        listing = self.listings.get(slug)
+        if not listing:
+            listing = self.listings[slug] = SequencedListing()
+            listing.task = asyncio.create_task(self.run(db.bind, slug, listing))
+        placed = asyncio.get_running_loop().create_future()
+        listing.queue.put_nowait((user_id, amount, placed))
+        return await placed
+
+    async def run(self, bind: AsyncEngine, slug: str, listing: SequencedListing):
+        try:
+            while not listing.queue.empty():
+                batch = []
+                while not listing.queue.empty() and len(batch) < self.batch_size:
+                    user_id, amount, placed = listing.queue.get_nowait()
+                    if placed.done():
+                        continue  # Its request is gone
+                    if amount <= listing.floor:
+                        placed.set_result(None)
+                        continue
+                    batch.append((user_id, amount, placed))
+                if batch:
+                    await self.place_batch(bind, slug, listing, batch)
+        finally:
+            del self.listings[slug]
+
+    async def place_batch(
+        self, bind: AsyncEngine, slug: str, listing: SequencedListing, batch: list
+    ):
+        try:
+            async with AsyncSession(bind, expire_on_commit=False) as db:
+                if len(batch) == 1:
+                    user_id, amount, _ = batch[0]
+                    results = [await bid_manager.place(db, slug, user_id, amount)]
+                else:
+                    results = await bid_manager.place_many(
+                        db, slug, [(user_id, amount) for user_id, amount, _ in batch]
+                    )
+        except Exception as exc:
+            for _, _, placed in batch:
+                if not placed.done():
+                    placed.set_exception(exc)
+            return
+
+        for (_, _, placed), result in zip(batch, results):
+            if result:
+                listing.floor = max(listing.floor, result.amount)
+            if not placed.done():
+                placed.set_result(result)
+
+
+def render_bid_event(event: BidEventSchema) -> str:
+    return encode_json(event).decode()
+
+
+async def stream_bid_events(
+    bind: AsyncEngine, slug: str
+) -> AsyncIterator[Optional[str]]:
+    """
+    The events of a listing's bid stream, a snapshot of its top bids followed by
+    each bid placed on it. None is yielded when there was nothing to send for
+    STREAM_KEEPALIVE seconds. Ends if the listing is gone, and right after the
+    snapshot if its auction is closed already.
+    """
+    # Subscribed before the snapshot is read, so that no bid falls in between
+    async with bid_broadcast.subscribe(slug) as queue:
+        async with AsyncSession(bind, expire_on_commit=False) as db:
+            listing = await listing_manager.get_by_slug(db, slug)
+            if not listing:
+                return
+            bids = await top_bids_cache.fetch(db, listing)
+        yield render_bid_event(
+            BidEventSchema(
+                event="snapshot",
+                highest_bid=listing.highest_bid,
+                bids_count=listing.bids_count,
+                bids=bids,
+            )
+        )
+        if not listing.active:
+            return
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield None
+
+
+top_bids_cache = TopBidsCache()
+bid_sequencer = BidSequencer()
@@ -0,0 +1,107 @@
+from typing import AsyncIterator, Dict, Optional, Set
+from contextlib import asynccontextmanager
+from uuid import uuid4
+import asyncio, json, logging
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel bid events are relayed to other workers through
+BIDS_CHANNEL = "bids"
+# Events kept for a subscriber that can't keep up, the oldest are dropped first
+SUBSCRIBER_QUEUE_SIZE = 32
+# Seconds before retrying the bridge's connection after it drops
+BRIDGE_RETRY_DELAY = 5
+
+
+class BidBroadcast:
+    """
+    Fans the bid events of a listing out to the WebSocket and SSE subscribers
+    of this worker. With the bridge running (see `start`), events are also sent
+    through Postgres NOTIFY, and the other workers' bridges LISTEN for them and
+    fan them out to their own subscribers.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # Tells this worker's events apart when they come back through the bridge
+        self.origin = uuid4().hex
+        self.engine: Optional[AsyncEngine] = None
+        self.bridge: Optional[asyncio.Task] = None
+        # Set while the bridge is listening
+        self.listening = asyncio.Event()
+        self.notifying: Set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def subscribe(self, slug: str) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(slug, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self.subscribers[slug]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self.subscribers[slug]
+
+    def deliver(self, slug: str, message: str):
+        for queue in self.subscribers.get(slug, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def publish(self, slug: str, message: str):
+        self.deliver(slug, message)
+        if self.bridge:
+            # Sent in the background, the bid is placed already
+            task = asyncio.create_task(self.notify(slug, message))
+            self.notifying.add(task)
+            task.add_done_callback(self.notifying.discard)
+
+    async def notify(self, slug: str, message: str):
+        payload = json.dumps({"origin": self.origin, "slug": slug, "message": message})
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(select(func.pg_notify(BIDS_CHANNEL, payload)))
+                await conn.commit()
+        except Exception:
+            logger.exception("Couldn't send a bid event to the other workers")
+
+    async def listen(self):
+        url = self.engine.url.set(drivername="postgresql")
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    url.render_as_string(hide_password=False), autocommit=True
+                )
+                async with conn:
+                    await conn.execute(f"LISTEN {BIDS_CHANNEL}")
+                    self.listening.set()
+                    async for notification in conn.notifies():
+                        event = json.loads(notification.payload)
+                        if event["origin"] != self.origin:
+                            self.deliver(event["slug"], event["message"])
+            except Exception:
+                logger.exception(
+                    "Bid bridge disconnected, reconnecting in %ss", BRIDGE_RETRY_DELAY
+                )
+            self.listening.clear()
+            await asyncio.sleep(BRIDGE_RETRY_DELAY)
+
+    def start(self, engine: AsyncEngine):
+        self.engine = engine
+        self.bridge = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.bridge:
+            self.bridge.cancel()
+            self.bridge = None
+            self.listening.clear()
+        if self.notifying:
+            await asyncio.gather(*self.notifying, return_exceptions=True)
+
+
+bid_broadcast = BidBroadcast()
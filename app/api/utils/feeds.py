@@ -0,0 +1,122 @@
+from typing import Any, AsyncIterator, Hashable, List, Optional, Set, Tuple
+from datetime import datetime
+from uuid import UUID
+import hashlib
+
+from starlite import MediaType, Response
+from starlite.utils import encode_json
+
+from app.api.utils.projections import encoder, listing_struct
+from app.common.cache import LRUCache, catalog_version
+from app.core.config import settings
+
+
+def open_listing(listing: Any) -> bytes:
+    # A projected listing serialized without its closing brace. The fields that
+    # change per request (see close_listing) are appended when it's rendered.
+    return encoder.encode(listing_struct(listing))[:-1]
+
+
+def close_listing(
+    body: bytes,
+    closing_date: datetime,
+    active: bool,
+    watched: Optional[bool],
+    now: datetime,
+) -> bytes:
+    time_left_seconds = int((closing_date - now).total_seconds())
+    active = active and time_left_seconds > 0
+    return b'%s,"time_left_seconds":%d,"active":%s,"watchlist":%s}' % (
+        body,
+        time_left_seconds,
+        b"true" if active else b"false",
+        b"null" if watched is None else b"true" if watched else b"false",
+    )
+
+
+class Feed:
+    # A pre-serialized page of listings, built from rows of the listings' column
+    # projection (`projected=True`). Its version, which responses are tagged with,
+    # is a digest of what it renders, so the same rows give the same ETag on every
+    # worker and after every rebuild.
+    def __init__(self, listings: List[Any], next_cursor: Optional[str]):
+        self.listing_ids: List[UUID] = []
+        self.items: List[Tuple[bytes, datetime, bool]] = []
+        for listing in listings:
+            self.listing_ids.append(listing.id)
+            self.items.append(
+                (open_listing(listing), listing.closing_date, listing.active)
+            )
+        self.next_cursor = encode_json(next_cursor)
+        digest = hashlib.blake2b(self.next_cursor, digest_size=16)
+        for body, closing_date, active in self.items:
+            digest.update(b"%s,%s,%d;" % (body, str(closing_date).encode(), active))
+        self.version = digest.hexdigest()
+
+    def render(self, message: str, watched_ids: Optional[Set[UUID]]) -> Response:
+        # Listings are flagged as watched or not, unless watched_ids is None
+        now = datetime.utcnow()
+        items = [
+            close_listing(
+                body,
+                closing_date,
+                active,
+                None if watched_ids is None else listing_id in watched_ids,
+                now,
+            )
+            for listing_id, (body, closing_date, active) in zip(
+                self.listing_ids, self.items
+            )
+        ]
+        content = b'{"status":"success","message":%s,"data":[%s],"next_cursor":%s}' % (
+            encode_json(message),
+            b",".join(items),
+            self.next_cursor,
+        )
+        return Response(content=content, media_type=MediaType.JSON)
+
+
+async def stream_listings(
+    message: str, chunks: AsyncIterator[List[Any]]
+) -> AsyncIterator[bytes]:
+    # Writes an unpaginated ListingsResponseSchema body chunk by chunk, as chunks of
+    # projected listings arrive. Listings aren't flagged as watched.
+    yield b'{"status":"success","message":%s,"data":[' % encode_json(message)
+    separator = b""
+    async for listings in chunks:
+        now = datetime.utcnow()
+        yield separator + b",".join(
+            close_listing(
+                open_listing(listing), listing.closing_date, listing.active, None, now
+            )
+            for listing in listings
+        )
+        separator = b","
+    yield b'],"next_cursor":null}'
+
+
+class FeedCache:
+    # Pre-serialized listing feeds, shared by every client. Keys embed the catalog
+    # version, so listing and bid writes of this worker invalidate them at once.
+    def __init__(self, maxsize: int = 256, ttl: int = settings.FEED_CACHE_TTL_SECONDS):
+        self.cache = LRUCache(maxsize, ttl)
+
+    def key(self, *args: Hashable) -> Hashable:
+        # Taken before querying, so a write racing the query can't be cached as current
+        return catalog_version.value, args
+
+    def get(self, key: Hashable) -> Optional[Feed]:
+        return self.cache.get(key)
+
+    def set(
+        self, key: Hashable, listings: List[Any], next_cursor: Optional[str]
+    ) -> Feed:
+        feed = Feed(listings, next_cursor)
+        self.cache.set(key, feed)
+        return feed
+
+    def clear(self):
+        self.cache.clear()
+
+
+feed_cache = FeedCache()
@@ -1,3 +1,4 @@
+from app.common.cache import LRUCache
 from app.core.config import settings
 import time
 import cloudinary
@@ -6,6 +7,9 @@ import mimetypes
 
 BASE_FOLDER = "bidout-auction-v3/"
 
+# A file's url only depends on its id, folder and type, so it's generated once
+file_urls = LRUCache(maxsize=settings.FILE_URL_CACHE_SIZE)
+
 # FILES CONFIG WITH CLOUDINARY
 cloudinary.config(
     cloud_name=settings.CLOUDINARY_CLOUD_NAME,
@@ -33,11 +37,17 @@ class FileProcessor:
             pass
 
     def generate_file_url(key, folder, content_type):
+        url = file_urls.get((key, folder, content_type))
+        if url:
+            return url
+
         file_extension = mimetypes.guess_extension(content_type)
-        key = f"{BASE_FOLDER}{folder}/{key}{file_extension}"
+        path = f"{BASE_FOLDER}{folder}/{key}{file_extension}"
 
         try:
-            return cloudinary.utils.cloudinary_url(key, secure=True)[0]
+            url = cloudinary.utils.cloudinary_url(path, secure=True)[0]
+            file_urls.set((key, folder, content_type), url)
+            return url
         except Exception as e:
             print(e)
             pass
@@ -0,0 +1,58 @@
+from typing import Optional
+import asyncio, logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.db.managers.accounts import otp_manager
+
+logger = logging.getLogger(__name__)
+
+
+class OtpPurger:
+    """
+    Deletes expired OTPs every `interval_seconds`, in batches of `batch_size`
+    (see OtpManager.purge_expired) so the otps table only holds live codes.
+    Codes are checked against their expiry when used, the purge only keeps the
+    table small. Batches skip locked rows, so every worker runs a purger of its own.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.OTP_PURGE_BATCH_SIZE,
+        interval_seconds: int = settings.OTP_PURGE_INTERVAL_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.engine: Optional[AsyncEngine] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def purge(self) -> int:
+        purged = 0
+        async with AsyncSession(self.engine) as db:
+            while True:
+                deleted = await otp_manager.purge_expired(db, self.batch_size)
+                purged += deleted
+                if deleted < self.batch_size:
+                    return purged
+
+    async def run(self):
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logger.exception("Purging expired OTPs failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, engine: AsyncEngine):
+        self.engine = engine
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+otp_purger = OtpPurger()
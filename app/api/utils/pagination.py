@@ -0,0 +1,66 @@
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+import base64, json
+
+from app.common.exception_handlers import RequestError
+
+# Parsers of the value cursors lead with, by the key listings are sorted on
+SORT_VALUE_PARSERS = {
+    "rank": float,
+    "highest_bid": Decimal,
+    "price": Decimal,
+    "bids_count": int,
+    "closing_date": datetime.fromisoformat,
+}
+
+
+def sort_key(sort: Optional[str]) -> Optional[str]:
+    # The key cursors lead with for a sort order. None when sorted by creation,
+    # since (created_at, id) is in every cursor already.
+    key = sort.lstrip("-") if sort else None
+    return key if key in SORT_VALUE_PARSERS else None
+
+
+# Cursors are opaque to clients. They hold the keyset, (created_at, id), of the
+# last listing on the previous page, led by the sort key and its value when
+# listings are sorted (or ranked) by something else.
+def encode_cursor(listing: Any, key: Optional[str] = None) -> str:
+    keyset = [listing.created_at.isoformat(), str(listing.id)]
+    if key:
+        value = getattr(listing, key)
+        if value is not None:
+            value = value.isoformat() if isinstance(value, datetime) else str(value)
+        keyset = [key, value, *keyset]
+    return base64.urlsafe_b64encode(json.dumps(keyset).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], key: Optional[str] = None) -> Optional[Tuple]:
+    if not cursor:
+        return None
+    try:
+        keyset = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if key:
+            cursor_key, value, *keyset = keyset
+            if cursor_key != key:
+                raise ValueError("Cursor of another sort order")
+        created_at, id = keyset
+        keyset = (datetime.fromisoformat(created_at), UUID(id))
+        if not key:
+            return keyset
+        # Listings without a value for the sort key (a closing date) hold null
+        return (None if value is None else SORT_VALUE_PARSERS[key](value), *keyset)
+    except Exception:
+        raise RequestError(err_msg="Invalid cursor", status_code=400)
+
+
+def paginate(
+    listings: List[Any], quantity: Optional[int], sort: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    # Managers fetch one row more than the page size when a quantity is given.
+    # That extra row is only used to tell whether another page exists.
+    if not quantity or len(listings) <= quantity:
+        return listings, None
+    listings = listings[:quantity]
+    return listings, encode_cursor(listings[-1], sort_key(sort))
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from uuid import UUID
+import time
+
+from app.core.config import settings
+from app.core.security import token_digest
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """
+        Bounded in-process cache that evicts the least recently used entry.
+        **Parameters**
+        * `maxsize`: Maximum number of entries kept
+        * `ttl`: Seconds after which an entry expires. Entries never expire if not set
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.entries.get(key)
+        if not entry:
+            return default
+        value, expires_at = entry
+        if expires_at and expires_at < time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class VersionCounter:
+    # Cache keys embed the current value, so bumping it invalidates them all at once
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+
+class PrincipalCache:
+    """
+    Users resolved from access tokens, keyed by the token's SHA-256 digest so the
+    tokens themselves aren't kept around. An entry is dropped when its token
+    expires or after `ttl` seconds, whichever comes first, so logouts made
+    through another worker (which can't invalidate this one's entries) take
+    effect within `ttl`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = LRUCache(maxsize, ttl)
+
+    def get(self, token: str) -> Any:
+        entry = self.cache.get(token_digest(token))
+        if not entry:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            return None
+        return user
+
+    def set(self, token: str, user: Any, expires_at: float):
+        self.cache.set(token_digest(token), (user, expires_at))
+
+    def invalidate(self, user_id: UUID):
+        # Logins, refreshes and logouts are rare next to the lookups, a scan will do
+        for key, ((user, _), _) in list(self.cache.entries.items()):
+            if user.id == user_id:
+                self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+# Bumped by every write that changes what the listing feeds show
+catalog_version = VersionCounter()
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
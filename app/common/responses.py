@@ -0,0 +1,50 @@
+from typing import Any, Optional
+import hashlib
+
+from starlite import Response
+from starlite.datastructures import MutableScopeHeaders
+from starlite.middleware.compression import (
+    CompressionMiddleware as BaseCompressionMiddleware,
+)
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    Digest of the version metadata a response is rendered from.
+    **Parameters**
+    * `parts`: Values that change whenever the response would
+    * `weak`: For responses that also hold values that change on their own (e.g. time left)
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match is compared weakly, W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(content=None, status_code=304, headers={"ETag": etag})
+
+
+class CompressionMiddleware(BaseCompressionMiddleware):
+    # A compressed body isn't byte for byte the one its strong ETag was made for, so
+    # the ETag is weakened. Conditional requests still match it.
+    def create_compression_send_wrapper(self, send, compression_encoding, scope):
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableScopeHeaders(message)
+                etag = headers.get("etag")
+                if etag and headers.get("content-encoding") and etag[0] == '"':
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+
+        return super().create_compression_send_wrapper(
+            send_with_weak_etag, compression_encoding, scope
+        )
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
 
     # SECURITY
     SECRET_KEY: str
+    # Codec JWTs are signed and verified with, "hmac" (standard library) or "jose"
+    TOKEN_CODEC: str = "hmac"
 
     # PROJECT DETAILS
     PROJECT_NAME: str
@@ -54,6 +56,36 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
 
+    # CACHING
+    # Other workers' writes aren't seen by a worker's caches, this bounds how stale they get
+    FEED_CACHE_TTL_SECONDS: int = 5
+    CATEGORY_CACHE_TTL_SECONDS: int = 60
+    FILE_URL_CACHE_SIZE: int = 10000
+    # Users resolved from access tokens, logouts on other workers reach a worker within the TTL
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+
+    # Responses smaller than this (bytes) aren't compressed
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+
+    # PASSWORD HASHING
+    # Threads bcrypt runs on, and hashes let wait for one before turning requests down
+    PASSWORD_HASHING_THREADS: int = 2
+    PASSWORD_HASHING_QUEUE_SIZE: int = 32
+    # bcrypt's cost is picked at startup so a hash takes about this long on the worker's CPU
+    PASSWORD_HASHING_TARGET_MS: int = 250
+    PASSWORD_HASHING_MIN_ROUNDS: int = 10
+
+    # AUCTION CLOSING
+    # Listings closed per transaction, and how often closing dates are reloaded
+    AUCTION_CLOSING_BATCH_SIZE: int = 100
+    AUCTION_CLOSING_REFRESH_SECONDS: int = 60
+
+    # OTP PURGING
+    # Expired codes deleted per transaction, and how often they're looked for
+    OTP_PURGE_BATCH_SIZE: int = 1000
+    OTP_PURGE_INTERVAL_SECONDS: int = 300
+
     @validator("SQLALCHEMY_DATABASE_URL", pre=True)
     def assemble_postgres_connection(
         cls, v: Optional[str], values: Dict[str, str]
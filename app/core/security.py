@@ -1,14 +1,244 @@
+from abc import ABC, abstractmethod
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+import asyncio, base64, hashlib, hmac, json, math, time
+
+from jose import jwt
 from passlib.context import CryptContext
 
+from app.common.exception_handlers import RequestError
+from app.core.config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
+# Claims holding a NumericDate, given as datetimes when encoding
+TIME_CLAIMS = ("exp", "iat", "nbf")
+# Registered claims python-jose checks besides exp, none of them are issued here
+FALLBACK_CLAIMS = {"iat", "nbf", "aud", "iss", "sub", "jti", "at_hash"}
+# bcrypt cost timed at startup, low enough to be quick and high enough to be steady
+CALIBRATION_ROUNDS = 8
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a thread pool of its own, off the event loop (bcrypt releases
+    the GIL while hashing). At most `threads` hashes run at once and `queue_size`
+    more wait for a thread, further ones are turned down with a 503 rather than
+    piling up behind them.
+    """
+
+    def __init__(self, threads: int, queue_size: int):
+        self.threads = threads
+        self.queue_size = queue_size
+        self.executor: Optional[ThreadPoolExecutor] = None
+        # Metrics
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, func: Callable, *args):
+        if self.pending >= self.threads + self.queue_size:
+            self.rejected += 1
+            raise RequestError(
+                err_msg="Too many requests, try again shortly", status_code=503
+            )
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(self.threads, "password-hasher")
+        queued_at = time.perf_counter()
+
+        def timed():
+            return time.perf_counter(), func(*args)
+
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        try:
+            started_at, result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, timed
+            )
+        finally:
+            self.pending -= 1
+        # Counted on the event loop, so the metrics need no lock
+        self.completed += 1
+        self.wait_seconds += started_at - queued_at
+        self.run_seconds += time.perf_counter() - started_at
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.wait_seconds / max(self.completed, 1) * 1000,
+            "avg_run_ms": self.run_seconds / max(self.completed, 1) * 1000,
+        }
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASHING_THREADS, settings.PASSWORD_HASHING_QUEUE_SIZE
+)
+
+
+def token_digest(token: str) -> bytes:
+    # Fixed-size stand-in for a token, to index and look it up by
+    return hashlib.sha256(token.encode()).digest()
+
+
+# JWTS
+def b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class TokenCodec(ABC):
+    """Signs claims into HS256 JWTs and verifies them back."""
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        pass
+
+    @abstractmethod
+    def decode(self, token: str) -> Optional[dict]:
+        # The token's claims, None if it's forged, malformed or expired
+        pass
+
+
+class JoseCodec(TokenCodec):
+    def __init__(self, key: str):
+        self.key = key
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, self.key, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> Optional[dict]:
+        try:
+            return jwt.decode(token, self.key, algorithms=[ALGORITHM])
+        except Exception:
+            return None
+
+
+class HmacCodec(TokenCodec):
+    """
+    HS256 with the standard library's hmac alone. The header is encoded once and
+    the key is hashed into an HMAC state once, copied for each token. Tokens come
+    out byte for byte as python-jose encodes them, so either codec reads the
+    other's. Tokens with another header, or with claims besides `exp` to check,
+    are left to `fallback`.
+    """
+
+    def __init__(self, key: str, fallback: TokenCodec):
+        self.mac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+        header = {"alg": ALGORITHM, "typ": "JWT"}
+        self.header = b64encode(json.dumps(header, separators=(",", ":")).encode())
+        self.fallback = fallback
+
+    def sign(self, signing_input: bytes) -> bytes:
+        mac = self.mac.copy()
+        mac.update(signing_input)
+        return b64encode(mac.digest())
+
+    def encode(self, claims: dict) -> str:
+        claims = {
+            key: timegm(value.utctimetuple())
+            if key in TIME_CLAIMS and isinstance(value, datetime)
+            else value
+            for key, value in claims.items()
+        }
+        payload = b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = self.header + b"." + payload
+        return (signing_input + b"." + self.sign(signing_input)).decode()
+
+    def decode(self, token: str) -> Optional[dict]:
+        try:
+            signing_input, signature = token.encode().rsplit(b".", 1)
+            header, payload = signing_input.split(b".")
+        except ValueError:
+            return None
+        if header != self.header:
+            return self.fallback.decode(token)
+        if not hmac.compare_digest(signature, self.sign(signing_input)):
+            return None
+        try:
+            claims = json.loads(b64decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict):
+            return None
+        exp = claims.get("exp", 0)
+        if not isinstance(exp, int) or FALLBACK_CLAIMS.intersection(claims):
+            return self.fallback.decode(token)
+        if "exp" in claims and exp < timegm(time.gmtime()):
+            return None
+        return claims
+
+
+def get_token_codec() -> TokenCodec:
+    jose_codec = JoseCodec(settings.SECRET_KEY)
+    if settings.TOKEN_CODEC == "jose":
+        return jose_codec
+    return HmacCodec(settings.SECRET_KEY, fallback=jose_codec)
+
+
+token_codec = get_token_codec()
 
 
 # PASSWORDS
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(
+        pwd_context.verify, plain_password, hashed_password
+    )
+
+
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    # Hashed with a cost out of this deployment's range, see calibrate_password_hashing
+    return pwd_context.needs_update(hashed_password)
+
+
+def time_bcrypt(rounds: int) -> float:
+    bcrypt = pwd_context.handler("bcrypt").using(rounds=rounds)
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hash("calibration")
+        timings.append(time.perf_counter() - start)
+    return min(timings)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def calibrate_password_hashing() -> int:
+    """
+    Sets bcrypt's cost to the one at which a hash takes about
+    PASSWORD_HASHING_TARGET_MS on this CPU, never below PASSWORD_HASHING_MIN_ROUNDS.
+    Each round doubles the time, so it's worked out from a hash at a low cost.
+    Hashes more than a round away from it are rehashed on login, a round either
+    way is let through so that workers timed slightly apart don't keep rehashing
+    each other's hashes.
+    """
+    elapsed = await password_hasher.run(time_bcrypt, CALIBRATION_ROUNDS)
+    target = settings.PASSWORD_HASHING_TARGET_MS / 1000
+    rounds = CALIBRATION_ROUNDS + round(math.log2(target / elapsed))
+    min_rounds = settings.PASSWORD_HASHING_MIN_ROUNDS
+    rounds = min(max(rounds, min_rounds), 31)
+    pwd_context.update(
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=max(rounds - 1, min_rounds),
+        bcrypt__max_rounds=rounds + 1,
+    )
+    return rounds
@@ -1,13 +1,24 @@
-from typing import Optional
+from typing import Optional, Sequence
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.interfaces import ORMOption
 
-from app.core.security import get_password_hash
+from app.common.cache import catalog_version, principal_cache
+from app.core.config import settings
+from app.core.security import get_password_hash, token_digest
 from app.db.managers.base import BaseManager
 from app.db.models.accounts import Jwt, Otp, User
 from uuid import UUID
 import random
 
+# Loading profile of the user behind an access token. Profiles and everything
+# showing the current user read the avatar.
+JWT_USER = (joinedload(Jwt.user).joinedload(User.avatar),)
+
 
 class UserManager(BaseManager[User]):
     async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
@@ -18,15 +29,19 @@ class UserManager(BaseManager[User]):
 
     async def create(self, db: AsyncSession, obj_in) -> User:
         # hash the password
-        obj_in.update({"password": get_password_hash(obj_in["password"])})
+        obj_in.update({"password": await get_password_hash(obj_in["password"])})
         return await super().create(db, obj_in)
 
     async def update(self, db: AsyncSession, db_obj: User, obj_in) -> Optional[User]:
         # hash the password
         password = obj_in.get("password")
         if password:
-            obj_in["password"] = get_password_hash(password)
+            obj_in["password"] = await get_password_hash(password)
         user = await super().update(db, db_obj, obj_in)
+        # Listing feeds show their auctioneer's name and avatar
+        if obj_in.keys() & {"first_name", "last_name", "avatar_id"}:
+            catalog_version.bump()
+        principal_cache.invalidate(user.id)
         return user
 
 
@@ -37,33 +52,100 @@ class OtpManager(BaseManager[Otp]):
         ).scalar_one_or_none()
         return otp
 
-    async def create(self, db: AsyncSession, obj_in) -> Optional[Otp]:
-        code = random.randint(100000, 999999)
-        obj_in.update({"code": code})
-        existing_otp = await self.get_by_user_id(db, obj_in["user_id"])
-        if existing_otp:
-            return await self.update(db, existing_otp, {"code": code})
-        return await super().create(db, obj_in)
+    async def create(self, db: AsyncSession, obj_in) -> Row:
+        # Issues the user a new code in one statement, replacing the one they had
+        now = datetime.utcnow()
+        values = {
+            "code": random.randint(100000, 999999),
+            "expires_at": now + timedelta(seconds=settings.EMAIL_OTP_EXPIRE_SECONDS),
+            "updated_at": now,
+        }
+        otp = (
+            await db.execute(
+                insert(self.model)
+                .values(user_id=obj_in["user_id"], created_at=now, **values)
+                .on_conflict_do_update(index_elements=["user_id"], set_=values)
+                .returning(self.model.code, self.model.expires_at)
+            )
+        ).one()
+        await db.commit()
+        return otp
+
+    async def consume(
+        self, db: AsyncSession, user_id: UUID, code: int
+    ) -> Optional[Row]:
+        # Deletes the user's code if it's the one given, returning when it expires.
+        # Left uncommitted, the caller commits it along with what the code was
+        # used for, or rolls it back if the code expired or that failed.
+        otp = (
+            await db.execute(
+                delete(self.model)
+                .where(self.model.user_id == user_id, self.model.code == code)
+                .returning(self.model.expires_at)
+            )
+        ).one_or_none()
+        return otp
+
+    async def purge_expired(self, db: AsyncSession, limit: int) -> int:
+        # Deletes up to `limit` expired codes, skipping those being consumed
+        expired = (
+            select(self.model.pkid)
+            .where(self.model.expires_at < datetime.utcnow())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.pkid.in_(expired.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
 
 
 class JwtManager(BaseManager[Jwt]):
-    async def get_by_user_id(self, db: AsyncSession, user_id: str) -> Optional[Jwt]:
+    async def get_by_user_id(
+        self, db: AsyncSession, user_id: str, load: Sequence[ORMOption] = ()
+    ) -> Optional[Jwt]:
         jwt = (
-            await db.execute(select(self.model).where(self.model.user_id == user_id))
+            await db.execute(
+                select(self.model).where(self.model.user_id == user_id).options(*load)
+            )
         ).scalar_one_or_none()
         return jwt
 
     async def get_by_refresh(self, db: AsyncSession, refresh: str) -> Optional[Jwt]:
         jwt = (
-            await db.execute(select(self.model).where(self.model.refresh == refresh))
+            await db.execute(
+                select(self.model).where(
+                    self.model.refresh_digest == token_digest(refresh)
+                )
+            )
         ).scalar_one_or_none()
         return jwt
 
+    async def create(self, db: AsyncSession, obj_in) -> Jwt:
+        obj_in["refresh_digest"] = token_digest(obj_in["refresh"])
+        return await super().create(db, obj_in)
+
+    async def bulk_create(self, db: AsyncSession, obj_in: list) -> Optional[bool]:
+        for item in obj_in:
+            item["refresh_digest"] = token_digest(item["refresh"])
+        return await super().bulk_create(db, obj_in)
+
+    async def update(self, db: AsyncSession, db_obj: Jwt, obj_in) -> Optional[Jwt]:
+        if "refresh" in obj_in:
+            obj_in["refresh_digest"] = token_digest(obj_in["refresh"])
+        jwt = await super().update(db, db_obj, obj_in)
+        principal_cache.invalidate(jwt.user_id)
+        return jwt
+
     async def delete_by_user_id(self, db: AsyncSession, user_id: UUID):
         jwt = (
             await db.execute(select(self.model).where(self.model.user_id == user_id))
         ).scalar_one_or_none()
         await self.delete(db, jwt)
+        principal_cache.invalidate(user_id)
 
 
 # How to use
@@ -1,16 +1,40 @@
 from datetime import datetime
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+)
 from uuid import UUID
 
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ORMOption
 
 from app.core.database import Base
 from app.db.models.base import File, GuestUser
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# Rows held at a time by the managers' streams
+STREAM_CHUNK_SIZE = 500
+
+
+async def stream_detached(
+    db: AsyncSession, stream: Callable[..., AsyncIterator], *args: Any
+) -> AsyncIterator:
+    # Runs a manager's stream in a session of its own. Streamed responses are
+    # written after the request's session is closed (once the response starts).
+    async with AsyncSession(db.bind, expire_on_commit=False) as session:
+        async for chunk in stream(session, *args):
+            yield chunk
+
 
 class BaseManager(Generic[ModelType]):
     def __init__(self, model: Type[ModelType]):
@@ -22,8 +46,10 @@ class BaseManager(Generic[ModelType]):
         """
         self.model = model
 
-    async def get_all(self, db: AsyncSession) -> Optional[List[ModelType]]:
-        result = (await db.execute(select(self.model))).scalars().all()
+    async def get_all(
+        self, db: AsyncSession, load: Sequence[ORMOption] = ()
+    ) -> Optional[List[ModelType]]:
+        result = (await db.execute(select(self.model).options(*load))).scalars().all()
         return result
 
     async def get_all_ids(self, db: AsyncSession) -> Optional[List[ModelType]]:
@@ -31,9 +57,15 @@ class BaseManager(Generic[ModelType]):
         # ids = [item[0] for item in items]
         return result
 
-    async def get_by_id(self, db: AsyncSession, id: UUID) -> Optional[ModelType]:
+    async def get_by_id(
+        self, db: AsyncSession, id: UUID, load: Sequence[ORMOption] = ()
+    ) -> Optional[ModelType]:
+        # Relationships are lazy="raise", 'load' holds the loader options of those
+        # the caller reads
         return (
-            await db.execute(select(self.model).where(self.model.id == id))
+            await db.execute(
+                select(self.model).where(self.model.id == id).options(*load)
+            )
         ).scalar_one_or_none()
 
     async def create(
@@ -1,10 +1,15 @@
-from typing import Optional
+from typing import Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.interfaces import ORMOption
 
 from .base import BaseManager
+from app.db.models.accounts import User
 from app.db.models.general import SiteDetail, Subscriber, Review
 
+REVIEW_DISPLAY = (joinedload(Review.reviewer).joinedload(User.avatar),)
+
 
 class SiteDetailManager(BaseManager[SiteDetail]):
     async def get(self, db: AsyncSession) -> Optional[SiteDetail]:
@@ -14,6 +19,11 @@ class SiteDetailManager(BaseManager[SiteDetail]):
             sitedetail = await self.create(db, {})
         return sitedetail
 
+    async def get_version(self, db: AsyncSession) -> Optional[Tuple]:
+        return (
+            await db.execute(select(self.model.id, self.model.updated_at))
+        ).one_or_none()
+
 
 class SubscriberManager(BaseManager[Subscriber]):
     async def get_by_email(self, db: AsyncSession, email: str) -> Optional[Subscriber]:
@@ -24,14 +34,34 @@ class SubscriberManager(BaseManager[Subscriber]):
 
 
 class ReviewManager(BaseManager[Review]):
-    async def get_active(self, db: AsyncSession) -> Optional[Review]:
+    async def get_active(
+        self, db: AsyncSession, load: Sequence[ORMOption] = REVIEW_DISPLAY
+    ) -> Optional[Review]:
         reviews = (
-            (await db.execute(select(self.model).where(self.model.show == True)))
+            (
+                await db.execute(
+                    select(self.model).where(self.model.show == True).options(*load)
+                )
+            )
             .scalars()
             .all()
         )
         return reviews
 
+    async def get_version(self, db: AsyncSession) -> Tuple:
+        # Changes whenever the active reviews, or their reviewers, do
+        return (
+            await db.execute(
+                select(
+                    func.count(),
+                    func.max(self.model.updated_at),
+                    func.max(User.updated_at),
+                )
+                .join(User, User.id == self.model.reviewer_id)
+                .where(self.model.show == True)
+            )
+        ).one()
+
     async def get_count(self, db: AsyncSession) -> Optional[int]:
         count = (
             await db.execute(
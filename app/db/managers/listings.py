@@ -1,16 +1,134 @@
-from typing import Optional, List, Any
-from sqlalchemy import or_, select
+from typing import (
+    Dict,
+    NamedTuple,
+    Optional,
+    List,
+    Any,
+    AsyncIterator,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+from sqlalchemy import (
+    and_,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    not_,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import REAL, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.interfaces import ORMOption
 
-from app.db.managers.base import BaseManager
-from app.db.models.listings import Category, Listing, WatchList, Bid
+from app.db.managers.base import BaseManager, STREAM_CHUNK_SIZE
+from app.db.models.accounts import User
+from app.db.models.base import File
+from app.db.models.listings import (
+    Category,
+    Listing,
+    RelatedListing,
+    WatchList,
+    Bid,
+    BidEntry,
+)
 from app.api.utils.auth import Authentication
+from app.common.cache import LRUCache, catalog_version
+from app.core.config import settings
 
-from uuid import UUID
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import UUID, uuid4
 from slugify import slugify
 
+RELATED_LISTINGS_COUNT = 3
+# Bounds of the price buckets listings are counted in, the last one is open-ended
+PRICE_BUCKETS = [100, 500, 1000, 5000, 10000]
+
+# Loading profiles, the relationships loaded along with displayed rows. They are
+# all many-to-one joins on `id` rather than the primary key, which selectin loading
+# can't look up directly (it joins back to the parent table), so they are joined.
+LISTING_DISPLAY = (
+    joinedload(Listing.auctioneer).joinedload(User.avatar),
+    joinedload(Listing.category),
+    joinedload(Listing.image),
+)
+BID_DISPLAY = (joinedload(Bid.user).joinedload(User.avatar),)
+WATCHLIST_DISPLAY = (joinedload(WatchList.listing).options(*LISTING_DISPLAY),)
+
+# Column projections, the bare columns the feeds and bids are rendered from when
+# passed `projected=True` (see app/api/utils/projections.py)
+Avatar, Image = aliased(File), aliased(File)
+LISTING_COLUMNS = (
+    Listing.id,
+    Listing.name,
+    Listing.slug,
+    Listing.desc,
+    Listing.price,
+    Listing.closing_date,
+    Listing.active,
+    Listing.bids_count,
+    Listing.highest_bid,
+    Listing.created_at,
+    Listing.image_id,
+    Image.resource_type.label("image_type"),
+    Listing.auctioneer_id,
+    User.first_name,
+    User.last_name,
+    User.avatar_id,
+    Avatar.resource_type.label("avatar_type"),
+    Category.name.label("category_name"),
+)
+BID_COLUMNS = (
+    Bid.amount,
+    Bid.created_at,
+    Bid.updated_at,
+    User.first_name,
+    User.last_name,
+    User.avatar_id,
+    Avatar.resource_type.label("avatar_type"),
+)
+
 
 class CategoryManager(BaseManager[Category]):
+    def __init__(self, model: Type[Category]):
+        super().__init__(model)
+        # Categories hardly ever change, so they are resolved in-process. The TTL
+        # bounds how long category writes made through other workers go unseen.
+        self.cache = LRUCache(maxsize=1, ttl=settings.CATEGORY_CACHE_TTL_SECONDS)
+
+    async def load_cache(
+        self, db: AsyncSession
+    ) -> Tuple[List[Category], Dict[str, Category]]:
+        categories = await super().get_all(db)
+        cached = (categories, {category.slug: category for category in categories})
+        self.cache.set("categories", cached)
+        return cached
+
+    async def get_cached(
+        self, db: AsyncSession
+    ) -> Tuple[List[Category], Dict[str, Category]]:
+        cached = self.cache.get("categories")
+        if not cached:
+            cached = await self.load_cache(db)
+        return cached
+
+    async def get_all(self, db: AsyncSession) -> Optional[List[Category]]:
+        categories, _ = await self.get_cached(db)
+        return categories
+
     async def get_by_name(self, db: AsyncSession, name: str) -> Optional[Category]:
         category = (
             await db.execute(select(self.model).where(self.model.name == name))
@@ -18,10 +136,8 @@ class CategoryManager(BaseManager[Category]):
         return category
 
     async def get_by_slug(self, db: AsyncSession, slug: str) -> Optional[Category]:
-        category = (
-            await db.execute(select(self.model).where(self.model.slug == slug))
-        ).scalar_one_or_none()
-        return category
+        _, categories_by_slug = await self.get_cached(db)
+        return categories_by_slug.get(slug)
 
     async def create(self, db: AsyncSession, obj_in) -> Optional[Category]:
         # Generate unique slug
@@ -30,84 +146,265 @@ class CategoryManager(BaseManager[Category]):
         slug = updated_slug if updated_slug else created_slug
 
         obj_in["slug"] = slug
-        slug_exists = await self.get_by_slug(db, slug)
+        # Checked against the database, the cache may not have other workers' categories yet
+        slug_exists = (
+            await db.execute(select(self.model.id).where(self.model.slug == slug))
+        ).scalar_one_or_none()
         if slug_exists:
             random_str = Authentication.get_random(4)
             obj_in["slug"] = f"{created_slug}-{random_str}"
             return await self.create(db, obj_in)
 
-        return await super().create(db, obj_in)
+        category = await super().create(db, obj_in)
+        self.cache.clear()
+        return category
+
+    async def bulk_create(self, db: AsyncSession, obj_in: list) -> Optional[bool]:
+        ids = await super().bulk_create(db, obj_in)
+        self.cache.clear()
+        return ids
+
+    async def update(
+        self, db: AsyncSession, db_obj: Category, obj_in
+    ) -> Optional[Category]:
+        category = await super().update(db, db_obj, obj_in)
+        self.cache.clear()
+        # Listing feeds show their category's name
+        catalog_version.bump()
+        return category
+
+    async def delete(self, db: AsyncSession, db_obj: Optional[Category]):
+        await super().delete(db, db_obj)
+        self.cache.clear()
+        catalog_version.bump()
 
 
 class ListingManager(BaseManager[Listing]):
-    async def get_all(self, db: AsyncSession) -> Optional[List[Listing]]:
+    def select(self, load: Sequence[ORMOption], projected: bool = False) -> Select:
+        # Listings with the relationships in `load`, or rows of LISTING_COLUMNS
+        if not projected:
+            return select(self.model).options(*load)
         return (
-            (
-                await db.execute(
-                    select(self.model).order_by(self.model.created_at.desc())
-                )
-            )
-            .scalars()
-            .all()
+            select(*LISTING_COLUMNS)
+            .join(User, User.id == self.model.auctioneer_id)
+            .outerjoin(Avatar, Avatar.id == User.avatar_id)
+            .outerjoin(Category, Category.id == self.model.category_id)
+            .outerjoin(Image, Image.id == self.model.image_id)
         )
 
+    def filter(
+        self,
+        stmt: Select,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        active: Optional[bool] = None,
+        closing_within_hours: Optional[int] = None,
+    ) -> Select:
+        now = datetime.utcnow()
+        if min_price is not None:
+            stmt = stmt.where(self.model.price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(self.model.price <= max_price)
+        if active is not None:
+            is_open = and_(self.model.active, self.model.closing_date > now)
+            stmt = stmt.where(is_open if active else not_(is_open))
+        if closing_within_hours is not None:
+            stmt = stmt.where(
+                self.model.closing_date > now,
+                self.model.closing_date <= now + timedelta(hours=closing_within_hours),
+            )
+        return stmt
+
+    def paginate(
+        self,
+        stmt: Select,
+        quantity: Optional[int],
+        cursor: Optional[Tuple],
+        sort: str = "-created_at",
+    ) -> Select:
+        # Keyset pagination on (created_at, id), newest first by default. Other sort
+        # keys lead the keyset, with created_at and id breaking ties.
+        key = sort.lstrip("-")
+        descending = sort.startswith("-")
+        keyset = [self.model.created_at, self.model.id]
+        if key != "created_at":
+            keyset.insert(0, getattr(self.model, key))
+
+        if descending:
+            stmt = stmt.order_by(*(column.desc() for column in keyset))
+        else:
+            stmt = stmt.order_by(*(column.asc() for column in keyset))
+        if cursor:
+            stmt = stmt.where(self.past_cursor(keyset, cursor, descending))
+        if quantity:
+            # Fetch an extra row to know whether there is a next page
+            stmt = stmt.limit(quantity + 1)
+        return stmt
+
+    def past_cursor(self, keyset: List, cursor: Tuple, descending: bool):
+        # Rows after the cursor in the sort order. Postgres sorts NULLs (listings
+        # without a closing date) as if greater than any value, last ascending and
+        # first descending, and tuple comparisons leave them out, so rows with a
+        # NULL sort key are compared on (created_at, id) apart from the others.
+        def past(columns, values):
+            return (
+                tuple_(*columns) < values if descending else tuple_(*columns) > values
+            )
+
+        if len(keyset) == 2:
+            return past(keyset, cursor)
+        column, value = keyset[0], cursor[0]
+        if value is None:
+            nulls = and_(column.is_(None), past(keyset[1:], cursor[1:]))
+            return or_(nulls, column.is_not(None)) if descending else nulls
+        if descending:
+            return past(keyset, cursor)
+        return or_(past(keyset, cursor), column.is_(None))
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        quantity: Optional[int] = None,
+        cursor: Optional[Tuple] = None,
+        sort: str = "-created_at",
+        load: Sequence[ORMOption] = LISTING_DISPLAY,
+        projected: bool = False,
+        **filters,
+    ) -> Optional[List[Listing]]:
+        stmt = self.filter(self.select(load, projected), **filters)
+        result = await db.execute(self.paginate(stmt, quantity, cursor, sort))
+        return result.all() if projected else result.scalars().all()
+
     async def get_by_auctioneer_id(
-        self, db: AsyncSession, auctioneer_id: UUID
+        self,
+        db: AsyncSession,
+        auctioneer_id: UUID,
+        quantity: Optional[int] = None,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
+        load: Sequence[ORMOption] = LISTING_DISPLAY,
+        projected: bool = False,
     ) -> Optional[Listing]:
-        return (
-            (
-                await db.execute(
-                    select(self.model)
-                    .where(self.model.auctioneer_id == auctioneer_id)
-                    .order_by(self.model.created_at.desc())
-                )
+        stmt = self.select(load, projected).where(
+            self.model.auctioneer_id == auctioneer_id
+        )
+        result = await db.execute(self.paginate(stmt, quantity, cursor))
+        return result.all() if projected else result.scalars().all()
+
+    async def stream_by_auctioneer_id(
+        self, db: AsyncSession, auctioneer_id: UUID
+    ) -> AsyncIterator[List[Row]]:
+        # Every listing of an auctioneer, as projected rows in chunks read through a
+        # server-side cursor, so a single chunk is held at a time
+        stmt = self.select((), projected=True).where(
+            self.model.auctioneer_id == auctioneer_id
+        )
+        result = await db.stream(
+            self.paginate(stmt, None, None).execution_options(
+                yield_per=STREAM_CHUNK_SIZE
             )
-            .scalars()
-            .all()
         )
+        async for rows in result.partitions():
+            yield rows
 
-    async def get_by_slug(self, db: AsyncSession, slug: str) -> Optional[Listing]:
+    async def get_by_slug(
+        self, db: AsyncSession, slug: str, load: Sequence[ORMOption] = ()
+    ) -> Optional[Listing]:
         listing = (
-            await db.execute(select(self.model).where(self.model.slug == slug))
+            await db.execute(
+                select(self.model).where(self.model.slug == slug).options(*load)
+            )
         ).scalar_one_or_none()
         return listing
 
-    async def get_related_listings(
-        self, db: AsyncSession, category_id: Any, slug: str
-    ) -> Optional[List[Listing]]:
-        listings = (
-            (
-                await db.execute(
-                    select(self.model)
-                    .where(
-                        self.model.category_id == category_id, self.model.slug != slug
-                    )
-                    .order_by(self.model.created_at.desc())
-                )
-            )
-            .scalars()
-            .all()
-        )
-        return listings
-
     async def get_by_category(
-        self, db: AsyncSession, category: Optional[Category]
+        self,
+        db: AsyncSession,
+        category: Optional[Category],
+        quantity: Optional[int] = None,
+        cursor: Optional[Tuple] = None,
+        sort: str = "-created_at",
+        load: Sequence[ORMOption] = LISTING_DISPLAY,
+        projected: bool = False,
+        **filters,
     ) -> Optional[Listing]:
         if category:
             category = category.id
 
-        listings = (
-            (
-                await db.execute(
-                    select(self.model)
-                    .where(self.model.category_id == category)
-                    .order_by(self.model.created_at.desc())
-                )
+        stmt = self.filter(
+            self.select(load, projected).where(self.model.category_id == category),
+            **filters,
+        )
+        result = await db.execute(self.paginate(stmt, quantity, cursor, sort))
+        return result.all() if projected else result.scalars().all()
+
+    async def search(
+        self,
+        db: AsyncSession,
+        terms: str,
+        category: Union[Category, str, None] = None,
+        quantity: Optional[int] = None,
+        cursor: Optional[Tuple[float, datetime, UUID]] = None,
+        load: Sequence[ORMOption] = LISTING_DISPLAY,
+        projected: bool = False,
+        **filters,
+    ) -> List[Tuple[Listing, float]]:
+        # Projected rows carry their rank as a 'rank' column
+        query = func.websearch_to_tsquery("english", terms)
+        rank = func.ts_rank(self.model.search_vector, query)
+        stmt = (
+            self.select(load, projected)
+            .add_columns(rank.label("rank"))
+            .where(self.model.search_vector.op("@@")(query))
+        )
+
+        # Category 'other' matches listings without a category
+        if category == "other":
+            stmt = stmt.where(self.model.category_id.is_(None))
+        elif category:
+            stmt = stmt.where(self.model.category_id == category.id)
+        stmt = self.filter(stmt, **filters)
+
+        # Keyset pagination on (rank, created_at, id), best matches first
+        stmt = stmt.order_by(
+            rank.desc(), self.model.created_at.desc(), self.model.id.desc()
+        )
+        if cursor:
+            # ts_rank is a real, compare against the cursor's rank at that precision
+            cursor_rank, created_at, id = cursor
+            stmt = stmt.where(
+                tuple_(rank, self.model.created_at, self.model.id)
+                < tuple_(cast(cursor_rank, REAL), created_at, id)
             )
-            .scalars()
-            .all()
+        if quantity:
+            stmt = stmt.limit(quantity + 1)
+        return (await db.execute(stmt)).all()
+
+    async def get_facets(
+        self, db: AsyncSession, **filters
+    ) -> Tuple[List[Tuple[Optional[UUID], int]], List[Tuple[int, int]]]:
+        # Counts per category and per price bucket, aggregated by one query with
+        # grouping sets. Bucket 0 is below the first bound of PRICE_BUCKETS.
+        bucket = func.width_bucket(
+            self.model.price,
+            literal_column(f"ARRAY{PRICE_BUCKETS}::numeric[]"),
         )
-        return listings
+        stmt = self.filter(
+            select(
+                func.grouping(self.model.category_id),
+                self.model.category_id,
+                bucket,
+                func.count(),
+            ),
+            **filters,
+        ).group_by(func.grouping_sets(tuple_(self.model.category_id), tuple_(bucket)))
+
+        category_counts, price_counts = [], []
+        for by_bucket, category_id, bucket, count in await db.execute(stmt):
+            if by_bucket:
+                price_counts.append((bucket, count))
+            else:
+                category_counts.append((category_id, count))
+        return category_counts, sorted(price_counts)
 
     async def create(self, db: AsyncSession, obj_in) -> Optional[Listing]:
         # Generate unique slug
@@ -122,7 +419,10 @@ class ListingManager(BaseManager[Listing]):
             obj_in["slug"] = f"{created_slug}-{random_str}"
             return await self.create(db, obj_in)
 
-        return await super().create(db, obj_in)
+        listing = await super().create(db, obj_in)
+        catalog_version.bump()
+        await related_listing_manager.add(db, listing)
+        return listing
 
     async def update(self, db: AsyncSession, db_obj: Listing, obj_in) -> Listing:
         name = obj_in.get("name")
@@ -138,7 +438,185 @@ class ListingManager(BaseManager[Listing]):
                 obj_in["slug"] = f"{created_slug}-{random_str}"
                 return await self.update(db, db_obj, obj_in)
 
-        return await super().update(db, db_obj, obj_in)
+        category_id, active = db_obj.category_id, db_obj.active
+        listing = await super().update(db, db_obj, obj_in)
+        # Bid placement and auction closing update listings too
+        catalog_version.bump()
+        if listing.category_id != category_id or listing.active != active:
+            # Moved to another category or closed/reopened
+            await related_listing_manager.remove(db, listing.id, category_id)
+            await related_listing_manager.add(db, listing)
+        return listing
+
+    async def close_due(self, db: AsyncSession, limit: int) -> List[Row]:
+        """
+        Closes up to `limit` open listings whose closing date has passed, writing
+        the holder of their highest bid as the winner. Listings being bid on are
+        skipped (they are locked) and left for the next call.
+        """
+        now = datetime.utcnow()
+        due = (
+            select(self.model.id)
+            .where(self.model.active, self.model.closing_date <= now)
+            .order_by(self.model.closing_date)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        winner = (
+            select(Bid.user_id)
+            .where(Bid.listing_id == self.model.id)
+            .order_by(Bid.amount.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        closed = (
+            await db.execute(
+                update(self.model)
+                .where(self.model.id == due.c.id)
+                .values(active=False, winner_id=winner, updated_at=now)
+                .returning(
+                    self.model.id,
+                    self.model.slug,
+                    self.model.highest_bid,
+                    self.model.bids_count,
+                    self.model.winner_id,
+                )
+            )
+        ).all()
+        await db.commit()
+        if closed:
+            catalog_version.bump()
+            await related_listing_manager.remove_many(db, [row.id for row in closed])
+        return closed
+
+
+class RelatedListingManager(BaseManager[RelatedListing]):
+    # Every category keeps one listing more than is displayed so that a listing
+    # in it can still be excluded from its own related listings.
+    head_size = RELATED_LISTINGS_COUNT + 1
+
+    async def get_related_listings(
+        self,
+        db: AsyncSession,
+        listing: Listing,
+        load: Sequence[ORMOption] = LISTING_DISPLAY,
+    ) -> Optional[List[Listing]]:
+        listings = (
+            (
+                await db.execute(
+                    select(Listing)
+                    .join(self.model, self.model.listing_id == Listing.id)
+                    .where(
+                        self.model.category_id == listing.category_id,
+                        self.model.listing_id != listing.id,
+                    )
+                    .order_by(self.model.listing_created_at.desc())
+                    .limit(RELATED_LISTINGS_COUNT)
+                    .options(*load)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        return listings
+
+    async def add(self, db: AsyncSession, listing: Listing):
+        if not listing.active:
+            return
+        await db.execute(
+            insert(self.model)
+            .values(
+                category_id=listing.category_id,
+                listing_id=listing.id,
+                listing_created_at=listing.created_at,
+            )
+            .on_conflict_do_nothing()
+        )
+        await self.trim(db, listing.category_id)
+        await db.commit()
+
+    async def remove(self, db: AsyncSession, listing_id: UUID, category_id: UUID):
+        removed = (
+            await db.execute(
+                delete(self.model)
+                .where(self.model.listing_id == listing_id)
+                .returning(self.model.id)
+            )
+        ).scalar_one_or_none()
+        if removed:
+            await self.refill(db, category_id)
+        await db.commit()
+
+    async def remove_many(self, db: AsyncSession, listing_ids: List[UUID]):
+        category_ids = (
+            (
+                await db.execute(
+                    delete(self.model)
+                    .where(self.model.listing_id.in_(listing_ids))
+                    .returning(self.model.category_id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        for category_id in set(category_ids):
+            await self.refill(db, category_id)
+        await db.commit()
+
+    async def refill(self, db: AsyncSession, category_id: Optional[UUID]):
+        # Top up a category with its most recent active listings not yet in it
+        candidates = (
+            select(
+                func.gen_random_uuid(),
+                func.now(),
+                func.now(),
+                Listing.category_id,
+                Listing.id,
+                Listing.created_at,
+            )
+            .where(
+                Listing.category_id == category_id,
+                Listing.active == True,
+                Listing.id.not_in(
+                    select(self.model.listing_id).where(
+                        self.model.category_id == category_id
+                    )
+                ),
+            )
+            .order_by(Listing.created_at.desc())
+            .limit(self.head_size)
+        )
+        await db.execute(
+            insert(self.model)
+            .from_select(
+                [
+                    "id",
+                    "created_at",
+                    "updated_at",
+                    "category_id",
+                    "listing_id",
+                    "listing_created_at",
+                ],
+                candidates,
+            )
+            .on_conflict_do_nothing()
+        )
+        await self.trim(db, category_id)
+
+    async def trim(self, db: AsyncSession, category_id: Optional[UUID]):
+        head = (
+            select(self.model.listing_id)
+            .where(self.model.category_id == category_id)
+            .order_by(self.model.listing_created_at.desc())
+            .limit(self.head_size)
+        )
+        await db.execute(
+            delete(self.model).where(
+                self.model.category_id == category_id,
+                self.model.listing_id.not_in(head),
+            )
+        )
 
 
 class WatchListManager(BaseManager[WatchList]):
@@ -177,7 +655,10 @@ class WatchListManager(BaseManager[WatchList]):
         return watchlist
 
     async def get_by_client_id(
-        self, db: AsyncSession, client_id: Optional[UUID]
+        self,
+        db: AsyncSession,
+        client_id: Optional[UUID],
+        load: Sequence[ORMOption] = WATCHLIST_DISPLAY,
     ) -> Optional[List[WatchList]]:
         if not client_id:
             return []
@@ -192,6 +673,7 @@ class WatchListManager(BaseManager[WatchList]):
                         )
                     )
                     .order_by(self.model.created_at.desc())
+                    .options(*load)
                 )
             )
             .scalars()
@@ -219,6 +701,31 @@ class WatchListManager(BaseManager[WatchList]):
         ).scalar_one_or_none()
         return watchlist
 
+    async def get_listing_ids_by_client_id(
+        self, db: AsyncSession, client_id: Optional[UUID], listing_ids: List[UUID]
+    ) -> Set[UUID]:
+        # Resolve the watchlist flags of a whole page of listings in one query
+        if not client_id or not listing_ids:
+            return set()
+
+        watched_ids = (
+            (
+                await db.execute(
+                    select(self.model.listing_id)
+                    .where(
+                        or_(
+                            self.model.user_id == client_id,
+                            self.model.session_key == client_id,
+                        )
+                    )
+                    .where(self.model.listing_id.in_(listing_ids))
+                )
+            )
+            .scalars()
+            .all()
+        )
+        return set(watched_ids)
+
     async def create(self, db: AsyncSession, obj_in: dict):
         user_id = obj_in.get("user_id")
         session_key = obj_in.get("session_key")
@@ -234,7 +741,29 @@ class WatchListManager(BaseManager[WatchList]):
         return await super().create(db, obj_in)
 
 
+class PlacedBid(NamedTuple):
+    listing_id: UUID
+    amount: Decimal
+    created_at: datetime
+    updated_at: datetime
+    # The user's first bid on the listing
+    created: bool
+    # The listing's version right before the bid
+    previous_highest_bid: Decimal
+    previous_bids_count: int
+
+
 class BidManager(BaseManager[Bid]):
+    def select(self, load: Sequence[ORMOption], projected: bool = False) -> Select:
+        # Bids with the relationships in `load`, or rows of BID_COLUMNS
+        if not projected:
+            return select(self.model).options(*load)
+        return (
+            select(*BID_COLUMNS)
+            .join(User, User.id == self.model.user_id)
+            .outerjoin(Avatar, Avatar.id == User.avatar_id)
+        )
+
     async def get_by_user_id(
         self, db: AsyncSession, user_id: UUID
     ) -> Optional[List[Bid]]:
@@ -252,20 +781,33 @@ class BidManager(BaseManager[Bid]):
         return bids
 
     async def get_by_listing_id(
-        self, db: AsyncSession, listing_id: UUID
+        self,
+        db: AsyncSession,
+        listing_id: UUID,
+        limit: Optional[int] = None,
+        load: Sequence[ORMOption] = BID_DISPLAY,
+        projected: bool = False,
     ) -> Optional[List[Bid]]:
-        bids = (
-            (
-                await db.execute(
-                    select(self.model)
-                    .where(self.model.listing_id == listing_id)
-                    .order_by(self.model.updated_at.desc())
-                )
-            )
-            .scalars()
-            .all()
+        result = await db.execute(
+            self.select(load, projected)
+            .where(self.model.listing_id == listing_id)
+            .order_by(self.model.updated_at.desc())
+            .limit(limit)
         )
-        return bids
+        return result.all() if projected else result.scalars().all()
+
+    async def stream_by_listing_id(
+        self, db: AsyncSession, listing_id: UUID
+    ) -> AsyncIterator[List[Row]]:
+        # Every bid on a listing, streamed like ListingManager.stream_by_auctioneer_id
+        result = await db.stream(
+            self.select((), projected=True)
+            .where(self.model.listing_id == listing_id)
+            .order_by(self.model.updated_at.desc())
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        async for rows in result.partitions():
+            yield rows
 
     async def get_by_user_and_listing_id(
         self, db: AsyncSession, user_id: UUID, listing_id: UUID
@@ -279,10 +821,279 @@ class BidManager(BaseManager[Bid]):
         ).scalar_one_or_none()
         return bid
 
+    async def place(
+        self, db: AsyncSession, slug: str, user_id: UUID, amount: Decimal
+    ) -> Optional[PlacedBid]:
+        """
+        Places a bid in a single transaction: the listing's highest bid is raised
+        only if it's still below `amount` and the auction is open, the bid is
+        appended to the ledger (BidEntry) and the user's current bid on the listing
+        inserted or updated from it, in one statement. Bidders of a listing queue on
+        its row lock, so each one sees the bid placed before.
+        Returns the bid (with the listing's version before it) or None if it wasn't
+        placed, in which case nothing is written.
+        """
+        now = datetime.utcnow()
+        previous = (
+            select(Listing.id, Listing.highest_bid, Listing.bids_count)
+            .where(
+                Listing.slug == slug,
+                Listing.auctioneer_id != user_id,
+                Listing.active.is_(True),
+                Listing.closing_date > now,
+                Listing.price <= amount,
+                Listing.highest_bid < amount,
+            )
+            # Rechecked against the latest version once locked, and bids already
+            # beaten aren't queued for the lock at all
+            .with_for_update()
+            .cte("previous")
+        )
+        placed = (
+            update(Listing)
+            .where(Listing.id == previous.c.id)
+            .values(highest_bid=amount, updated_at=now)
+            .returning(Listing.id, previous.c.highest_bid, previous.c.bids_count)
+            .cte("placed")
+        )
+        # Read once the lock is held, so bids are stamped in the order placed
+        stamped = select(
+            placed.c.id,
+            func.timezone("UTC", func.clock_timestamp()).label("placed_at"),
+        ).subquery("stamped")
+        entry = (
+            insert(BidEntry.__table__)
+            .from_select(
+                ["id", "user_id", "listing_id", "amount", "created_at", "updated_at"],
+                select(
+                    literal(uuid4()),
+                    literal(user_id),
+                    stamped.c.id,
+                    literal(amount),
+                    stamped.c.placed_at,
+                    stamped.c.placed_at,
+                ),
+            )
+            .returning(*BidEntry.__table__.c["user_id", "listing_id", "created_at"])
+            .cte("entry")
+        )
+        # The user's current bid follows the entry
+        upsert = insert(self.model.__table__).from_select(
+            ["id", "user_id", "listing_id", "amount", "created_at", "updated_at"],
+            select(
+                literal(uuid4()),
+                entry.c.user_id,
+                entry.c.listing_id,
+                literal(amount),
+                entry.c.created_at,
+                entry.c.created_at,
+            ),
+        )
+        placed_bid = (
+            upsert.on_conflict_do_update(
+                constraint="unique_user_listing_bids",
+                set_={
+                    "amount": upsert.excluded.amount,
+                    "updated_at": upsert.excluded.updated_at,
+                },
+            )
+            .returning(
+                self.model.listing_id,
+                self.model.amount,
+                self.model.created_at,
+                self.model.updated_at,
+                # Inserted rather than updated, the user's first bid on the listing
+                literal_column("xmax = 0").label("created"),
+            )
+            .cte("placed_bid")
+        )
+        stmt = select(
+            placed_bid,
+            placed.c.highest_bid.label("previous_highest_bid"),
+            placed.c.bids_count.label("previous_bids_count"),
+        ).where(placed.c.id == placed_bid.c.listing_id)
+        try:
+            bid = (await db.execute(stmt)).one_or_none()
+        except IntegrityError:
+            # Another bid holds the amount (unique_listing_amount_bids)
+            bid = None
+        if not bid:
+            await db.rollback()
+            return None
+
+        if bid.created:
+            # The listing's row is still locked by the update above
+            await db.execute(
+                update(Listing)
+                .where(Listing.id == bid.listing_id)
+                .values(bids_count=Listing.bids_count + 1)
+            )
+        await db.commit()
+        catalog_version.bump()
+        return PlacedBid(**bid._mapping)
+
+    async def place_many(
+        self, db: AsyncSession, slug: str, bids: List[Tuple[UUID, Decimal]]
+    ) -> List[Optional[PlacedBid]]:
+        """
+        Places a burst of bids on a listing in a single transaction, as if they
+        were placed one after the other in the order given. The listing is locked
+        and updated once for all of them, and every bid is appended to the ledger.
+        Returns what `place` would for each bid.
+        """
+        now = datetime.utcnow()
+        listing = (
+            await db.execute(
+                select(
+                    Listing.id,
+                    Listing.auctioneer_id,
+                    Listing.price,
+                    Listing.highest_bid,
+                    Listing.bids_count,
+                )
+                .where(
+                    Listing.slug == slug,
+                    Listing.active.is_(True),
+                    Listing.closing_date > now,
+                    Listing.highest_bid < max(amount for _, amount in bids),
+                )
+                .with_for_update()
+            )
+        ).one_or_none()
+        if not listing:
+            await db.rollback()
+            return [None] * len(bids)
+
+        # Stamped once the lock is held, in the order placed. By the database's
+        # clock, as `place` stamps bids, so that updated_at orders bids placed
+        # either way.
+        placed_at = (
+            await db.execute(select(func.timezone("UTC", func.clock_timestamp())))
+        ).scalar_one()
+        accepted = {}
+        rows = {}
+        entries = []
+        highest_bid = listing.highest_bid
+        for idx, (user_id, amount) in enumerate(bids):
+            if (
+                user_id == listing.auctioneer_id
+                or amount < listing.price
+                or amount <= highest_bid
+            ):
+                continue
+            highest_bid = amount
+            accepted[idx] = placed_at + timedelta(microseconds=len(accepted))
+            entries.append(
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "listing_id": listing.id,
+                    "amount": amount,
+                    "created_at": accepted[idx],
+                    "updated_at": accepted[idx],
+                }
+            )
+            # A user holds a single bid per listing, the last one placed
+            row = rows.setdefault(
+                user_id,
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "listing_id": listing.id,
+                    "created_at": accepted[idx],
+                },
+            )
+            row.update(amount=amount, updated_at=accepted[idx])
+        if not accepted:
+            await db.rollback()
+            return [None] * len(bids)
+
+        # Every accepted bid is appended, including those a user outbid in the burst
+        await db.execute(insert(BidEntry.__table__).values(entries))
+        upsert = insert(self.model.__table__).values(list(rows.values()))
+        placed_bids = (
+            upsert.on_conflict_do_update(
+                constraint="unique_user_listing_bids",
+                set_={
+                    "amount": upsert.excluded.amount,
+                    "updated_at": upsert.excluded.updated_at,
+                },
+            )
+            .returning(
+                self.model.user_id,
+                self.model.created_at,
+                literal_column("xmax = 0").label("created"),
+            )
+            .cte("placed_bids")
+        )
+        created_count = (
+            select(func.count())
+            .select_from(placed_bids)
+            .where(placed_bids.c.created)
+            .scalar_subquery()
+        )
+        placed = (
+            update(Listing)
+            .where(Listing.id == listing.id)
+            .values(
+                highest_bid=highest_bid,
+                bids_count=Listing.bids_count + created_count,
+                updated_at=placed_at,
+            )
+            .returning(Listing.id)
+            .cte("placed")
+        )
+        try:
+            by_user = {
+                row.user_id: row
+                for row in await db.execute(select(placed_bids).join(placed, true()))
+            }
+        except IntegrityError:
+            # Another bid holds an amount (unique_listing_amount_bids)
+            await db.rollback()
+            return [None] * len(bids)
+        await db.commit()
+        catalog_version.bump()
+
+        results = []
+        previous_highest_bid = listing.highest_bid
+        previous_bids_count = listing.bids_count
+        for idx, (user_id, amount) in enumerate(bids):
+            if idx not in accepted:
+                results.append(None)
+                continue
+            row = by_user[user_id]
+            created = row.created and row.created_at == accepted[idx]
+            results.append(
+                PlacedBid(
+                    listing.id,
+                    amount,
+                    row.created_at,
+                    accepted[idx],
+                    created,
+                    previous_highest_bid,
+                    previous_bids_count,
+                )
+            )
+            previous_highest_bid = amount
+            previous_bids_count += created
+        return results
+
     async def create(self, db: AsyncSession, obj_in: dict):
         user_id = obj_in["user_id"]
         listing_id = obj_in["listing_id"]
 
+        # Appended to the ledger, committed along with the user's current bid
+        now = datetime.utcnow()
+        db.add(
+            BidEntry(
+                user_id=user_id,
+                listing_id=listing_id,
+                amount=obj_in["amount"],
+                created_at=now,
+                updated_at=now,
+            )
+        )
         existing_bid = await bid_manager.get_by_user_and_listing_id(
             db, user_id, listing_id
         )
@@ -295,11 +1106,47 @@ class BidManager(BaseManager[Bid]):
         return new_bid
 
 
+class BidEntryManager(BaseManager[BidEntry]):
+    # Reads of the bid ledger. Entries are never locked or updated, so these don't
+    # hold up bids being placed.
+    async def get_by_listing_id(
+        self, db: AsyncSession, listing_id: UUID, limit: Optional[int] = None
+    ) -> Optional[List[BidEntry]]:
+        entries = (
+            (
+                await db.execute(
+                    select(self.model)
+                    .where(self.model.listing_id == listing_id)
+                    .order_by(self.model.created_at.desc())
+                    .limit(limit)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        return entries
+
+    async def stream_between(
+        self, db: AsyncSession, start: datetime, end: datetime
+    ) -> AsyncIterator[List[BidEntry]]:
+        # Every bid placed in [start, end), streamed for exports and analytics
+        result = await db.stream(
+            select(self.model)
+            .where(self.model.created_at >= start, self.model.created_at < end)
+            .order_by(self.model.created_at)
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        async for entries in result.scalars().partitions():
+            yield entries
+
+
 # How to use
 category_manager = CategoryManager(Category)
 listing_manager = ListingManager(Listing)
+related_listing_manager = RelatedListingManager(RelatedListing)
 watchlist_manager = WatchListManager(WatchList)
 bid_manager = BidManager(Bid)
+bid_entry_manager = BidEntryManager(BidEntry)
 
 
 # this can now be used to perform any available crud actions e.g category_manager.get_by_id(db=db, id=id)
@@ -55,14 +55,21 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # A transaction per migration, so migrations building indexes concurrently
+    # (in an autocommit block) only commit their own work early
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
 async def run_async_migrations() -> None:
-    async with sqlalchemy_config.engine.begin() as connection:
+    # Alembic manages the transactions itself
+    async with sqlalchemy_config.engine.connect() as connection:
         await connection.run_sync(do_run_migrations)
 
 
@@ -0,0 +1,75 @@
+"""Refresh token digests
+
+Revision ID: 51d6e4385602
+Revises: 0053bcf0f1d9
+Create Date: 2026-10-18 01:06:12.781824
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "51d6e4385602"
+down_revision = "0053bcf0f1d9"
+branch_labels = None
+depends_on = None
+
+
+# Rows digested per transaction, so sessions aren't all locked at once
+BACKFILL_BATCH_SIZE = 10000
+DIGEST = "sha256(convert_to(refresh, 'UTF8'))"
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jwts", sa.Column("refresh_digest", sa.LargeBinary(length=32), nullable=True)
+    )
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        bounds = conn.execute(sa.text("SELECT min(pkid), max(pkid) FROM jwts")).one()
+        if bounds[0] is not None:
+            for start in range(bounds[0], bounds[1] + 1, BACKFILL_BATCH_SIZE):
+                conn.execute(
+                    sa.text(
+                        f"UPDATE jwts SET refresh_digest = {DIGEST} "
+                        "WHERE pkid >= :start AND pkid < :end"
+                    ),
+                    {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+                )
+        # Sessions created meanwhile by workers still on the previous release
+        conn.execute(
+            sa.text(
+                f"UPDATE jwts SET refresh_digest = {DIGEST} "
+                "WHERE refresh_digest IS NULL"
+            )
+        )
+        # Built without blocking writes, then turned into the constraint
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS jwts_refresh_digest_key")
+        op.create_index(
+            "jwts_refresh_digest_key",
+            "jwts",
+            ["refresh_digest"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "ALTER TABLE jwts ADD CONSTRAINT jwts_refresh_digest_key "
+            "UNIQUE USING INDEX jwts_refresh_digest_key"
+        )
+        op.drop_index(
+            "ix_jwts_refresh", table_name="jwts", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_jwts_refresh",
+            "jwts",
+            ["refresh"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint("jwts_refresh_digest_key", "jwts", type_="unique")
+    op.drop_column("jwts", "refresh_digest")
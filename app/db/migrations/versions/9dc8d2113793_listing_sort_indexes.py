@@ -0,0 +1,65 @@
+"""Listing sort indexes
+
+Revision ID: 9dc8d2113793
+Revises: 8383a5e3a347
+Create Date: 2026-10-17 23:53:01.888321
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9dc8d2113793"
+down_revision = "8383a5e3a347"
+branch_labels = None
+depends_on = None
+
+# (name, columns, options) of every index on listings. They are built
+# CONCURRENTLY, outside of a transaction, so writes to listings aren't blocked
+# meanwhile.
+INDEXES = [
+    ("ix_listings_bids_count_created_at_id", ["bids_count", "created_at", "id"], {}),
+    (
+        "ix_listings_category_id_created_at_id",
+        ["category_id", "created_at", "id"],
+        {},
+    ),
+    (
+        "ix_listings_closing_date_created_at_id",
+        ["closing_date", "created_at", "id"],
+        {},
+    ),
+    (
+        "ix_listings_highest_bid_created_at_id",
+        ["highest_bid", "created_at", "id"],
+        {},
+    ),
+    (
+        "ix_listings_open_closing_date",
+        ["closing_date"],
+        {"postgresql_where": sa.text("active")},
+    ),
+    ("ix_listings_price_created_at_id", ["price", "created_at", "id"], {}),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            # A failed concurrent build leaves an INVALID index behind, drop it
+            # before running the migration again
+            op.create_index(
+                name,
+                "listings",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                **options,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="listings", postgresql_concurrently=True)
@@ -1,8 +1,10 @@
 from sqlalchemy import (
     Boolean,
     Column,
+    DateTime,
     ForeignKey,
     Integer,
+    LargeBinary,
     String,
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -10,7 +12,6 @@ from sqlalchemy.orm import relationship, Mapped
 
 from .base import BaseModel, File
 from datetime import datetime
-from app.core.config import settings
 
 from uuid import UUID as GUUID  # General UUID
 
@@ -33,7 +34,7 @@ class User(BaseModel):
         ForeignKey("files.id", ondelete="SET NULL"),
         unique=True,
     )
-    avatar: Mapped[File] = relationship("File", lazy="joined")
+    avatar: Mapped[File] = relationship("File", lazy="raise")
 
     @property
     def full_name(self):
@@ -50,9 +51,11 @@ class Jwt(BaseModel):
         ForeignKey("users.id", ondelete="CASCADE"),
         unique=True,
     )
-    user: Mapped[User] = relationship("User", lazy="joined")
+    user: Mapped[User] = relationship("User", lazy="raise")
     access: Mapped[str] = Column(String())
     refresh: Mapped[str] = Column(String())
+    # SHA-256 of the refresh token, which refreshes look the session up by
+    refresh_digest: Mapped[bytes] = Column(LargeBinary(32), unique=True)
 
     def __repr__(self):
         return f"Access - {self.access} | Refresh - {self.refresh}"
@@ -65,15 +68,10 @@ class Otp(BaseModel):
         ForeignKey("users.id", ondelete="CASCADE"),
         unique=True,
     )
-    user: Mapped[User] = relationship("User", lazy="joined")
+    user: Mapped[User] = relationship("User", lazy="raise")
     code: Mapped[int] = Column(Integer())
+    # Indexed for the purge of expired codes, see OtpPurger
+    expires_at: Mapped[datetime] = Column(DateTime, index=True)
 
     def __repr__(self):
-        return f"User - {self.user.full_name} | Code - {self.code}"
-
-    def check_expiration(self):
-        now = datetime.utcnow()
-        diff = now - self.updated_at
-        if diff.total_seconds() > settings.EMAIL_OTP_EXPIRE_SECONDS:
-            return True
-        return False
+        return f"User - {self.user_id} | Code - {self.code}"
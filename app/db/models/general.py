@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, relationship
 
 from sqlalchemy.dialects.postgresql import UUID
@@ -43,10 +43,15 @@ class Review(BaseModel):
         UUID(),
         ForeignKey("users.id", ondelete="CASCADE"),
     )
-    reviewer: Mapped[User] = relationship("User", lazy="joined")
+    reviewer: Mapped[User] = relationship("User", lazy="raise")
 
     show: Mapped[bool] = Column(Boolean, default=False)
     text: Mapped[str] = Column(String(200))
 
     def __repr__(self):
         return str(self.reviewer_id)
+
+    __table_args__ = (
+        # Only shown reviews are ever queried
+        Index("ix_reviews_show", "show", postgresql_where=show),
+    )
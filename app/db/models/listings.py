@@ -1,17 +1,20 @@
 from sqlalchemy import (
     Boolean,
     Column,
+    Computed,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     Numeric,
     UniqueConstraint,
+    text,
 )
-from sqlalchemy.orm import Mapped, relationship, validates
+from sqlalchemy.orm import Mapped, deferred, relationship, validates
 
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from uuid import UUID as GUUID  # General UUID
 
 from app.db.models.accounts import User
@@ -42,7 +45,11 @@ class Listing(BaseModel):
     auctioneer_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
     )
-    auctioneer: Mapped[User] = relationship("User", lazy="joined")
+    # Relationships are never loaded implicitly. Each manager query picks what to
+    # load with them (see the loading profiles in app/db/managers).
+    auctioneer: Mapped[User] = relationship(
+        "User", foreign_keys=[auctioneer_id], lazy="raise"
+    )
 
     name: Mapped[str] = Column(String(70))
     slug: Mapped[str] = Column(String(), unique=True)
@@ -53,20 +60,37 @@ class Listing(BaseModel):
         ForeignKey("categories.id", ondelete="SET NULL"),
         nullable=True,
     )
-    category: Mapped[Category] = relationship("Category", lazy="joined")
+    category: Mapped[Category] = relationship("Category", lazy="raise")
 
     price: Mapped[float] = Column(Numeric(precision=10, scale=2))
     highest_bid: Mapped[float] = Column(Numeric(precision=10, scale=2), default=0.00)
     bids_count: Mapped[int] = Column(Integer, default=0)
     closing_date: Mapped[datetime] = Column(DateTime, nullable=True)
     active: Mapped[bool] = Column(Boolean, default=True)
+    # Holder of the highest bid, written when the auction closes
+    winner_id: Mapped[GUUID] = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
 
     image_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True),
         ForeignKey("files.id", ondelete="SET NULL"),
         unique=True,
     )
-    image: Mapped[File] = relationship("File", lazy="joined")
+    image: Mapped[File] = relationship("File", lazy="raise")
+
+    # Generated by Postgres from the name (weighted highest) and description.
+    # Deferred, since only search queries need it.
+    search_vector: Mapped[str] = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(\"desc\", '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     def __repr__(self):
         return self.name
@@ -83,6 +107,58 @@ class Listing(BaseModel):
             return 0
         return self.time_left_seconds
 
+    __table_args__ = (
+        Index("ix_listings_search_vector", "search_vector", postgresql_using="gin"),
+        # Keysets of the feeds' sort orders, (created_at, id) breaking ties
+        Index("ix_listings_created_at_id", "created_at", "id"),
+        Index(
+            "ix_listings_auctioneer_id_created_at_id",
+            "auctioneer_id",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_listings_category_id_created_at_id", "category_id", "created_at", "id"
+        ),
+        Index(
+            "ix_listings_highest_bid_created_at_id", "highest_bid", "created_at", "id"
+        ),
+        Index("ix_listings_bids_count_created_at_id", "bids_count", "created_at", "id"),
+        Index("ix_listings_price_created_at_id", "price", "created_at", "id"),
+        Index(
+            "ix_listings_closing_date_created_at_id", "closing_date", "created_at", "id"
+        ),
+        # Active-only and closing-soon filters only ever look at open listings
+        Index(
+            "ix_listings_open_closing_date",
+            "closing_date",
+            postgresql_where=text("active"),
+        ),
+    )
+
+
+class RelatedListing(BaseModel):
+    # Holds the most recent active listings of each category (category_id is null
+    # for category 'other'). It is maintained on write, so a listing's related
+    # listings are read from here instead of scanning the whole category.
+    __tablename__ = "related_listings"
+
+    category_id: Mapped[GUUID] = Column(
+        UUID(as_uuid=True),
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    listing_id: Mapped[GUUID] = Column(
+        UUID(as_uuid=True),
+        ForeignKey("listings.id", ondelete="CASCADE"),
+        unique=True,
+    )
+    listing_created_at: Mapped[datetime] = Column(DateTime)
+
+    def __repr__(self):
+        return str(self.listing_id)
+
 
 class Bid(BaseModel):
     __tablename__ = "bids"
@@ -90,7 +166,7 @@ class Bid(BaseModel):
     user_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
     )
-    user: Mapped[User] = relationship("User", lazy="joined")
+    user: Mapped[User] = relationship("User", lazy="raise")
 
     listing_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("listings.id", ondelete="CASCADE")
@@ -98,11 +174,37 @@ class Bid(BaseModel):
     amount: Mapped[float] = Column(Numeric(precision=10, scale=2))
 
     def __repr__(self):
-        return f"{self.listing.name} - ${self.amount}"
+        return f"{self.listing_id} - ${self.amount}"
 
     __table_args__ = (
         UniqueConstraint("listing_id", "amount", name="unique_listing_amount_bids"),
         UniqueConstraint("user_id", "listing_id", name="unique_user_listing_bids"),
+        Index("ix_bids_listing_id_updated_at", "listing_id", "updated_at"),
+    )
+
+
+class BidEntry(BaseModel):
+    # Every bid placed, in order, never updated or deleted on its own. Bid holds
+    # each user's current bid on a listing and Listing.highest_bid the highest,
+    # both written along with the entry (see BidManager.place).
+    __tablename__ = "bid_entries"
+
+    user_id: Mapped[GUUID] = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
+    )
+    listing_id: Mapped[GUUID] = Column(
+        UUID(as_uuid=True), ForeignKey("listings.id", ondelete="CASCADE")
+    )
+    amount: Mapped[float] = Column(Numeric(precision=10, scale=2))
+
+    def __repr__(self):
+        return f"{self.listing_id} - ${self.amount}"
+
+    __table_args__ = (
+        Index("ix_bid_entries_listing_id_created_at", "listing_id", "created_at"),
+        # Entries are appended in created_at order, so a BRIN index serves time
+        # ranges at next to no cost to inserts
+        Index("ix_bid_entries_created_at", "created_at", postgresql_using="brin"),
     )
 
 
@@ -112,21 +214,19 @@ class WatchList(BaseModel):
     user_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
     )
-    user: Mapped[User] = relationship("User", lazy="joined")
+    user: Mapped[User] = relationship("User", lazy="raise")
 
     listing_id: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("listings.id", ondelete="CASCADE")
     )
-    listing: Mapped[Listing] = relationship("Listing", lazy="joined")
+    listing: Mapped[Listing] = relationship("Listing", lazy="raise")
 
     session_key: Mapped[GUUID] = Column(
         UUID(as_uuid=True), ForeignKey("guestusers.id", ondelete="CASCADE")
     )
 
     def __repr__(self):
-        if self.user:
-            return f"{self.listing.name} - {self.user.full_name()}"
-        return f"{self.listing.name} - {self.session_key}"
+        return f"{self.listing_id} - {self.user_id or self.session_key}"
 
     __table_args__ = (
         UniqueConstraint(
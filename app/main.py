@@ -3,14 +3,22 @@ from starlite import (
     OpenAPIConfig,
     OpenAPIController,
     CORSConfig,
+    State,
 )
+from starlite.config.compression import CompressionConfig
 from starlite.middleware import RateLimitConfig
 from pydantic_openapi_schema.v3_1_0 import Components, SecurityScheme
 
 from app.core.config import settings
-from app.core.database import sqlalchemy_plugin
+from app.core.database import sqlalchemy_config, sqlalchemy_plugin
 from app.common.exception_handlers import exc_handlers
+from app.common.responses import CompressionMiddleware
 from app.api.routers import all_routers
+from app.api.utils.auctions import auction_closer
+from app.api.utils.broadcast import bid_broadcast
+from app.api.utils.otps import otp_purger
+from app.core.security import calibrate_password_hashing, password_hasher
+from app.db.managers.listings import category_manager
 
 
 class MyOpenAPIController(OpenAPIController):
@@ -44,6 +52,17 @@ rate_limit_config = RateLimitConfig(rate_limit=("minute", 1000))
 cors_config = CORSConfig(
     allow_origins=settings.CORS_ALLOWED_ORIGINS, allow_credentials=True
 )
+# Brotli for clients that accept it, gzip otherwise. Small bodies are sent as they are
+compression_config = CompressionConfig(
+    backend="brotli",
+    brotli_gzip_fallback=True,
+    brotli_quality=4,
+    gzip_compress_level=6,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    middleware_class=CompressionMiddleware,
+    # Event streams are sent as they happen, not buffered for compression
+    exclude_opt_key="skip_compression",
+)
 
 app = Starlite(
     route_handlers=all_routers,
@@ -52,4 +71,31 @@ app = Starlite(
     plugins=[sqlalchemy_plugin],
     exception_handlers=exc_handlers,
     cors_config=cors_config,
+    compression_config=compression_config,
+)
+
+
+async def warm_category_cache(state: State) -> None:
+    async with state["session_maker_class"]() as db:
+        await category_manager.load_cache(db)
+
+
+async def start_background_tasks(state: State) -> None:
+    engine = state[sqlalchemy_config.engine_app_state_key]
+    bid_broadcast.start(engine)
+    auction_closer.start(engine)
+    otp_purger.start(engine)
+
+
+async def stop_background_tasks() -> None:
+    await otp_purger.stop()
+    await auction_closer.stop()
+    await bid_broadcast.stop()
+    password_hasher.shutdown()
+
+
+# Appended after construction so they run once the plugin has set up the session maker
+app.on_startup.extend(
+    [calibrate_password_hashing, warm_category_cache, start_background_tasks]
 )
+app.on_shutdown.insert(0, stop_background_tasks)
@@ -0,0 +1,129 @@
+"""
+Compares placing bids the way create_bid did before (read the listing and the
+user's bid, then save the bid and the listing, committing each) against
+bid_manager.place, with every bidder bidding on one listing at once. Reports
+bids/second, statements and commits per bid, failed placements and whether the
+listing ends up consistent with its bids.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_bid_placement.py [bidders] [rounds]
+"""
+
+import asyncio, os, random, sys, time
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from decimal import Decimal
+from sqlalchemy import delete, event, update
+
+from benchmarks.base import (
+    QueryCounter,
+    get_engine,
+    get_sessionmaker,
+    reset_db,
+    seed_bidders,
+    seed_listings,
+)
+from app.db.managers.listings import bid_manager, listing_manager
+from app.db.models.listings import Bid, Listing
+
+
+async def sequential_place(db, slug, user_id, amount):
+    # The steps create_bid took before, checks included
+    listing = await listing_manager.get_by_slug(db, slug)
+    if amount < listing.price or amount <= listing.highest_bid:
+        return None
+    bids_count = listing.bids_count
+    bid = await bid_manager.get_by_user_and_listing_id(db, user_id, listing.id)
+    if bid:
+        bid = await bid_manager.update(db, bid, {"amount": amount})
+    else:
+        bids_count += 1
+        bid = await bid_manager.create(
+            db, {"user_id": user_id, "listing_id": listing.id, "amount": amount}
+        )
+    await listing_manager.update(
+        db, listing, {"highest_bid": amount, "bids_count": bids_count}
+    )
+    return bid
+
+
+async def atomic_place(db, slug, user_id, amount):
+    return await bid_manager.place(db, slug, user_id, amount)
+
+
+async def main(bidders: int, rounds: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        seeded = await seed_listings(db, 1)
+        user_ids = await seed_bidders(db, bidders)
+        await db.commit()
+    listing_id = seeded["listing_ids"][0]
+    slug = "listing-0"
+
+    commits = 0
+
+    def count_commit(*args):
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+
+    # Bidders outbid each other, some of them with the same amount at once
+    rng = random.Random(0)
+    attempts = [
+        (user_id, Decimal(1001 + idx + rng.randint(0, 10)))
+        for idx, user_id in enumerate(user_ids * rounds)
+    ]
+    print(f"{bidders} bidders, {len(attempts)} bids on one listing")
+
+    for label, place in (
+        ("before (read then save)", sequential_place),
+        ("after (bid_manager.place)", atomic_place),
+    ):
+        async with SessionLocal() as db:
+            await db.execute(delete(Bid))
+            await db.execute(
+                update(Listing)
+                .where(Listing.id == listing_id)
+                .values(highest_bid=0, bids_count=0)
+            )
+            await db.commit()
+
+        async def attempt(user_id, amount):
+            async with SessionLocal() as db:
+                try:
+                    return await place(db, slug, user_id, amount)
+                except Exception:
+                    return "failed"
+
+        commits = 0
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(attempt(*item) for item in attempts))
+            elapsed = time.perf_counter() - start
+
+        async with SessionLocal() as db:
+            listing = await listing_manager.get_by_id(db, listing_id)
+            bids = await bid_manager.get_by_listing_id(db, listing_id, load=())
+        consistent = listing.bids_count == len(bids) and listing.highest_bid == max(
+            (bid.amount for bid in bids), default=0
+        )
+        placed = sum(1 for result in results if result and result != "failed")
+        print(
+            f"{label:<28} {len(attempts) / elapsed:8.0f} bids/s"
+            f" statements/bid={counter.count / len(attempts):5.2f}"
+            f" commits/placed={commits / max(placed, 1):5.2f}"
+            f" placed={placed} failed={results.count('failed')}"
+            f" consistent={consistent}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    bidders = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    asyncio.run(main(bidders, rounds))
@@ -0,0 +1,97 @@
+"""
+Compares bidders on one hot listing placing their bids straight through
+bid_manager.place (each transaction queueing on the listing's row lock) against
+placing them through the bid sequencer, as create_bid does. Every bidder bids at
+once, the way the final seconds of a popular auction go. Reports accepted
+bids/second, the latency of each bid and the transactions committed.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_bid_sequencer.py [bidders]
+"""
+
+import asyncio, os, random, sys, time
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from decimal import Decimal
+from sqlalchemy import delete, event, update
+
+from benchmarks.base import (
+    get_engine,
+    get_sessionmaker,
+    percentile,
+    reset_db,
+    seed_bidders,
+    seed_listings,
+)
+from app.api.utils.bids import bid_sequencer
+from app.db.managers.listings import bid_manager
+from app.db.models.listings import Bid, Listing
+
+
+async def main(bidders: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        seeded = await seed_listings(db, 1)
+        user_ids = await seed_bidders(db, bidders)
+        await db.commit()
+    listing_id = seeded["listing_ids"][0]
+    slug = "listing-0"
+
+    commits = 0
+
+    def count_commit(*args):
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+
+    # Bidders outbid each other, some of them with the same amount at once
+    rng = random.Random(0)
+    attempts = [
+        (user_id, Decimal(1001 + idx + rng.randint(0, 10)))
+        for idx, user_id in enumerate(user_ids)
+    ]
+    print(f"{bidders} bidders on one listing")
+
+    for label, placer in (
+        ("before (bid_manager.place)", bid_manager),
+        ("after (bid_sequencer.place)", bid_sequencer),
+    ):
+        async with SessionLocal() as db:
+            await db.execute(delete(Bid))
+            await db.execute(
+                update(Listing)
+                .where(Listing.id == listing_id)
+                .values(highest_bid=0, bids_count=0)
+            )
+            await db.commit()
+
+        latencies = []
+
+        async def attempt(user_id, amount):
+            start = time.perf_counter()
+            async with SessionLocal() as db:
+                placed = await placer.place(db, slug, user_id, amount)
+            latencies.append((time.perf_counter() - start) * 1000)
+            return placed
+
+        commits = 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*(attempt(*item) for item in attempts))
+        elapsed = time.perf_counter() - start
+        accepted = sum(1 for result in results if result)
+        print(
+            f"{label:<30} accepted={accepted:5d} {accepted / elapsed:7.0f} accepted/s"
+            f" p50={percentile(latencies, 50):8.2f}ms"
+            f" p99={percentile(latencies, 99):8.2f}ms commits={commits}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    bidders = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    asyncio.run(main(bidders))
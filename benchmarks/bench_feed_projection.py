@@ -0,0 +1,114 @@
+"""
+Compares rendering listing feeds and bids from ORM objects through the Pydantic
+schemas against the column projection fast path (`projected=True` rendered with
+app/api/utils/projections.py). Reports rows/second and peak memory of a render.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_feed_projection.py [rows] [iterations]
+"""
+
+import asyncio, os, sys, time, tracemalloc
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from starlite.utils import encode_json
+
+from benchmarks.base import (
+    get_engine,
+    get_sessionmaker,
+    percentile,
+    reset_db,
+    seed_bids,
+    seed_listings,
+)
+from app.api.schemas.listings import (
+    BidsResponseDataSchema,
+    BidsResponseSchema,
+    ListingDataSchema,
+    ListingsResponseSchema,
+)
+from app.api.utils.feeds import Feed
+from app.api.utils.projections import stream_bids
+from app.db.managers.listings import bid_manager, listing_manager
+
+
+async def measure(label: str, db, func, rows: int, iterations: int) -> None:
+    samples = []
+    for _ in range(iterations):
+        # Start from an empty identity map, as each request does
+        db.expunge_all()
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+
+    db.expunge_all()
+    tracemalloc.start()
+    body = await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<32} {rows / percentile(samples, 50):10.0f} rows/s"
+        f" peak={peak / 1024 / 1024:7.2f}MiB body={len(body)}B"
+    )
+
+
+async def main(rows: int, iterations: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        seeded = await seed_listings(db, rows)
+        listing_id = seeded["listing_ids"][0]
+        await seed_bids(db, listing_id, rows)
+        listing = await listing_manager.get_by_id(db, listing_id)
+
+        async def schema_listings():
+            listings = await listing_manager.get_all(db)
+            data = [
+                ListingDataSchema(
+                    time_left_seconds=listing.time_left_seconds,
+                    watchlist=False,
+                    **listing.dict(),
+                )
+                for listing in listings
+            ]
+            return encode_json(
+                ListingsResponseSchema(message="Listings fetched", data=data)
+            )
+
+        async def projected_listings():
+            listings = await listing_manager.get_all(db, projected=True)
+            return Feed(listings, None).render("Listings fetched", set()).body
+
+        async def schema_bids():
+            bids = await bid_manager.get_by_listing_id(db, listing_id)
+            data = BidsResponseDataSchema(listing=listing.name, bids=bids)
+            return encode_json(
+                BidsResponseSchema(message="Listing Bids fetched", data=data)
+            )
+
+        async def projected_bids():
+            bids = await bid_manager.get_by_listing_id(db, listing_id, projected=True)
+
+            async def chunks():
+                yield bids
+
+            body = stream_bids("Listing Bids fetched", listing.name, chunks())
+            return b"".join([chunk async for chunk in body])
+
+        print(f"{rows} listings and {rows} bids, {iterations} iterations")
+        for label, func in (
+            ("listings before (schemas)", schema_listings),
+            ("listings after (projection)", projected_listings),
+            ("bids before (schemas)", schema_bids),
+            ("bids after (projection)", projected_bids),
+        ):
+            await measure(label, db, func, rows, iterations)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(rows, iterations))
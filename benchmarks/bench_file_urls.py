@@ -0,0 +1,71 @@
+"""
+Measures how much of rendering a listing feed goes to generating file urls, by
+rendering the same rows with the file url cache cleared before every render
+(as every call generated urls before) and with it warm.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_file_urls.py [listings] [iterations]
+"""
+
+import asyncio, os, sys
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from benchmarks.base import (
+    get_engine,
+    get_sessionmaker,
+    report,
+    reset_db,
+    seed_listings,
+    timed,
+)
+from app.api.schemas.listings import ListingDataSchema
+from app.api.utils.feeds import Feed
+from app.api.utils.file_processors import file_urls
+from app.db.managers.listings import listing_manager
+
+
+async def main(listings_count: int, iterations: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        await seed_listings(db, listings_count)
+        # Rows are fetched once, only rendering them is timed
+        rows = await listing_manager.get_all(db, projected=True)
+        listings = await listing_manager.get_all(db)
+
+        async def render_projection():
+            return Feed(rows, None)
+
+        async def render_schemas():
+            return [
+                ListingDataSchema(
+                    time_left_seconds=listing.time_left_seconds, **listing.dict()
+                )
+                for listing in listings
+            ]
+
+        print(f"{listings_count} listings, {iterations} iterations")
+        for name, render in (
+            ("projection", render_projection),
+            ("schemas", render_schemas),
+        ):
+
+            async def cold():
+                file_urls.clear()
+                return await render()
+
+            print(f"\n{name}")
+            for label, func in (("before (urls generated)", cold), ("after", render)):
+                await func()
+                samples = await timed(func, iterations)
+                report(label, samples, listings=listings_count)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    listings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(listings_count, iterations))
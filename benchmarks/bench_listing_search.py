@@ -0,0 +1,97 @@
+"""
+Compares searching listings with an ILIKE scan of name/desc against the ranked
+full-text search (`listing_manager.search`) backed by the GIN-indexed tsvector.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_listing_search.py [listings] [iterations]
+"""
+
+import asyncio, os, sys, time
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from sqlalchemy import and_, or_, select, text
+
+from benchmarks.base import (
+    bulk_seed_listings,
+    get_engine,
+    get_sessionmaker,
+    report,
+    reset_db,
+    timed,
+)
+from app.db.managers.listings import listing_manager
+from app.db.models.listings import Listing
+
+PAGE_SIZE = 20
+SEARCHES = ["vintage camera", "restored guitar", "signed limited painting"]
+
+
+async def main(listings_count: int, iterations: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        start = time.perf_counter()
+        await bulk_seed_listings(db, listings_count)
+        await db.execute(text("ANALYZE listings"))
+        print(f"Seeded {listings_count} listings in {time.perf_counter() - start:.1f}s")
+
+        for terms in SEARCHES:
+
+            async def ilike_scan():
+                words = [
+                    or_(
+                        Listing.name.ilike(f"%{word}%"), Listing.desc.ilike(f"%{word}%")
+                    )
+                    for word in terms.split()
+                ]
+                stmt = (
+                    select(Listing)
+                    .where(and_(*words))
+                    .order_by(Listing.created_at.desc(), Listing.id.desc())
+                    .limit(PAGE_SIZE + 1)
+                )
+                return (await db.execute(stmt)).scalars().all()
+
+            async def full_text_search():
+                return await listing_manager.search(db, terms, quantity=PAGE_SIZE)
+
+            async def full_text_search_filtered():
+                return await listing_manager.search(
+                    db,
+                    terms,
+                    min_price=500,
+                    max_price=5000,
+                    active=True,
+                    quantity=PAGE_SIZE,
+                )
+
+            matches = (
+                await db.execute(
+                    select(text("count(*)"))
+                    .select_from(Listing)
+                    .where(
+                        Listing.search_vector.op("@@")(
+                            text("websearch_to_tsquery('english', :terms)")
+                        )
+                    ),
+                    {"terms": terms},
+                )
+            ).scalar()
+            print(f"\n'{terms}': {matches} matching listings, {iterations} iterations")
+            for label, func in (
+                ("before (ILIKE scan)", ilike_scan),
+                ("after (full-text search)", full_text_search),
+                ("after (search + filters)", full_text_search_filtered),
+            ):
+                samples = await timed(func, iterations)
+                report(label, samples, rows=len(await func()))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    listings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(listings_count, iterations))
@@ -0,0 +1,118 @@
+"""
+Compares loading every relationship with joins on each query, as the models used to
+with lazy="joined", against the loading profiles each manager query now picks.
+Reports statements, rows and bytes fetched alongside timings.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_loading_profiles.py [listings] [iterations]
+"""
+
+import asyncio, os, sys
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from sqlalchemy.orm import joinedload
+
+from benchmarks.base import (
+    FetchCounter,
+    get_engine,
+    get_sessionmaker,
+    report,
+    reset_db,
+    seed_listings,
+    timed,
+)
+from app.db.managers.listings import (
+    LISTING_DISPLAY,
+    WATCHLIST_DISPLAY,
+    listing_manager,
+    watchlist_manager,
+)
+from app.db.models.accounts import User
+from app.db.models.listings import Listing, WatchList
+
+PAGE_SIZE = 20
+
+# What lazy="joined" on every relationship amounted to
+JOINED_LISTING = (
+    joinedload(Listing.auctioneer).joinedload(User.avatar),
+    joinedload(Listing.category),
+    joinedload(Listing.image),
+)
+JOINED_WATCHLIST = (
+    joinedload(WatchList.user).joinedload(User.avatar),
+    joinedload(WatchList.listing).options(*JOINED_LISTING),
+)
+
+
+async def main(listings_count: int, iterations: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        seeded = await seed_listings(db, listings_count)
+        client_id = seeded["user_id"]
+        # Watch every fourth listing
+        await watchlist_manager.bulk_create(
+            db,
+            [
+                {"user_id": client_id, "listing_id": listing_id}
+                for listing_id in seeded["listing_ids"][::4]
+            ],
+        )
+        slug = "listing-0"
+
+        cases = [
+            (
+                "listings feed page",
+                lambda load: listing_manager.get_all(db, PAGE_SIZE, load=load),
+                JOINED_LISTING,
+                LISTING_DISPLAY,
+            ),
+            (
+                "bid placement lookup",
+                lambda load: listing_manager.get_by_slug(db, slug, load),
+                JOINED_LISTING,
+                (),
+            ),
+            (
+                "listing update lookup",
+                lambda load: listing_manager.get_by_slug(db, slug, load),
+                JOINED_LISTING,
+                (joinedload(Listing.category),),
+            ),
+            (
+                "watchlist",
+                lambda load: watchlist_manager.get_by_client_id(db, client_id, load),
+                JOINED_WATCHLIST,
+                WATCHLIST_DISPLAY,
+            ),
+        ]
+        print(f"{listings_count} listings, {iterations} iterations")
+        for name, query, before, after in cases:
+            print(f"\n{name}")
+            for label, load in (("before (all joined)", before), ("after", after)):
+
+                async def func():
+                    # Start from an empty identity map, as each request does
+                    db.expunge_all()
+                    return await query(load)
+
+                samples = await timed(func, iterations)
+                with FetchCounter(engine) as counter:
+                    await func()
+                report(
+                    label,
+                    samples,
+                    queries=counter.count,
+                    rows=counter.rows,
+                    bytes=counter.bytes,
+                )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    listings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(main(listings_count, iterations))
@@ -0,0 +1,91 @@
+"""
+Measures the latency of the listings feed on a worker while a burst of logins
+comes in, with bcrypt run on the event loop (as login did before) against run on
+the password hasher's thread pool (verify_password). Reports feed p50/p99 with no
+logins, during each burst, and the logins/second and hasher metrics.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_login_burst.py [logins] [feed_requests]
+"""
+
+import asyncio, os, sys, time
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from sqlalchemy import update
+
+from benchmarks.base import (
+    get_engine,
+    get_sessionmaker,
+    report,
+    reset_db,
+    seed_bidders,
+    seed_listings,
+)
+from app.core.security import password_hasher, pwd_context, verify_password
+from app.db.managers.accounts import user_manager
+from app.db.managers.listings import listing_manager
+from app.db.models.accounts import User
+
+PASSWORD = "benchmark-password"
+
+
+async def blocking_verify(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+async def main(logins: int, feed_requests: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        await seed_listings(db, 100)
+        await seed_bidders(db, logins)
+        await db.execute(update(User).values(password=pwd_context.hash(PASSWORD)))
+        await db.commit()
+
+    async def feed():
+        async with SessionLocal() as db:
+            await listing_manager.get_all(db, 20)
+
+    async def serve_feed():
+        # A request arrives every 20ms and is timed from its arrival to its
+        # response, so time spent waiting on a blocked event loop counts
+        samples = []
+        start = time.perf_counter()
+        for idx in range(feed_requests):
+            arrival = start + idx * 0.02
+            await asyncio.sleep(max(arrival - time.perf_counter(), 0))
+            await feed()
+            samples.append((time.perf_counter() - arrival) * 1000)
+        return samples
+
+    async def login(idx, verify):
+        async with SessionLocal() as db:
+            user = await user_manager.get_by_email(db, f"bench-bidder{idx}@example.com")
+        return await verify(PASSWORD, user.password)
+
+    await feed()  # Warm up the pool
+    report("feed, no logins", await serve_feed())
+    for label, verify in (
+        ("feed, logins before (on loop)", blocking_verify),
+        ("feed, logins after (thread pool)", verify_password),
+    ):
+        start = time.perf_counter()
+        logins_done, samples = await asyncio.gather(
+            asyncio.gather(*(login(idx, verify) for idx in range(logins))),
+            serve_feed(),
+        )
+        elapsed = time.perf_counter() - start
+        assert all(logins_done)
+        report(label, samples, logins_per_s=f"{logins / elapsed:.1f}")
+    print(password_hasher.metrics())
+
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    feed_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(main(logins, feed_requests))
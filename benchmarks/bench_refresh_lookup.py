@@ -0,0 +1,100 @@
+"""
+Compares looking sessions up by refresh token the ways jwts has been indexed: an
+equality match on the full token with no index, the same match on a btree over
+the token (ix_jwts_refresh) and jwt_manager.get_by_refresh on the unique SHA-256
+digest (jwts_refresh_digest_key). Reports lookup latency and index size.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_refresh_lookup.py [sessions] [lookups]
+"""
+
+import asyncio, os, random, sys
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from sqlalchemy import select, text
+
+from benchmarks.base import get_engine, get_sessionmaker, report, reset_db, timed
+from app.db.managers.accounts import jwt_manager
+from app.db.models.accounts import Jwt
+
+# Refresh tokens are JWTs, sharing their header
+TOKEN = "'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.' || md5(g::text) || md5((-g)::text) || '.' || md5((g * 7)::text)"
+
+
+async def main(sessions: int, lookups: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, first_name, last_name, email, password) "
+                "SELECT gen_random_uuid(), 'Bench', 'User', 'bench' || g || '@example.com', '' "
+                "FROM generate_series(1, :sessions) g"
+            ),
+            {"sessions": sessions},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO jwts (id, user_id, access, refresh, refresh_digest) "
+                f"SELECT gen_random_uuid(), id, '', {TOKEN}, sha256(convert_to({TOKEN}, 'UTF8')) "
+                "FROM (SELECT id, row_number() OVER () AS g FROM users) AS numbered"
+            )
+        )
+        await conn.execute(text("ANALYZE jwts"))
+        tokens = (
+            (
+                await conn.execute(
+                    text(
+                        "SELECT refresh FROM jwts TABLESAMPLE SYSTEM (1) LIMIT :lookups"
+                    ),
+                    {"lookups": lookups},
+                )
+            )
+            .scalars()
+            .all()
+        )
+    print(f"{sessions} sessions, {len(tokens)} lookups")
+
+    async def index_size(name):
+        async with engine.connect() as conn:
+            size = await conn.scalar(text(f"SELECT pg_relation_size('{name}')"))
+        return f"{size / 1024 / 1024:.1f}MiB"
+
+    async with SessionLocal() as db:
+
+        def by_token():
+            token = random.choice(tokens)
+            return db.execute(select(Jwt).where(Jwt.refresh == token))
+
+        async def by_digest():
+            assert await jwt_manager.get_by_refresh(db, random.choice(tokens))
+
+        # A sequential scan each, fewer of them will do
+        samples = await timed(by_token, max(len(tokens) // 10, 1))
+        report("before (no index)", samples)
+
+        await db.execute(text("CREATE INDEX ix_jwts_refresh ON jwts (refresh)"))
+        await db.commit()
+        samples = await timed(by_token, len(tokens))
+        report(
+            "before (ix_jwts_refresh)",
+            samples,
+            index=await index_size("ix_jwts_refresh"),
+        )
+
+        samples = await timed(by_digest, len(tokens))
+        report(
+            "after (refresh digest)",
+            samples,
+            index=await index_size("jwts_refresh_digest_key"),
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    asyncio.run(main(sessions, lookups))
@@ -0,0 +1,96 @@
+"""
+Compares the peak memory of building the auctioneer's listings and bids responses
+in one piece against streaming them in chunks from a server-side cursor, as rows
+grow.
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_streaming.py [rows,rows,...]
+"""
+
+import asyncio, os, sys, tracemalloc
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from benchmarks.base import (
+    get_engine,
+    get_sessionmaker,
+    reset_db,
+    seed_bids,
+    seed_listings,
+)
+from app.api.utils.feeds import Feed, stream_listings
+from app.api.utils.projections import stream_bids
+from app.db.managers.base import stream_detached
+from app.db.managers.listings import bid_manager, listing_manager
+
+
+async def measure(label: str, func) -> None:
+    # Timings are left out, tracing allocations slows everything down
+    tracemalloc.start()
+    size = await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} peak={peak / 1024 / 1024:8.2f}MiB body={size}B")
+
+
+async def drain(chunks) -> int:
+    # What the server does with a streamed body, each chunk is sent then dropped
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+async def main(sizes: list) -> None:
+    engine = get_engine()
+    SessionLocal = get_sessionmaker(engine)
+
+    for rows in sizes:
+        await reset_db(engine)
+        async with SessionLocal() as db:
+            seeded = await seed_listings(db, rows)
+            user_id, listing_id = seeded["user_id"], seeded["listing_ids"][0]
+            await seed_bids(db, listing_id, rows)
+
+            async def buffered_listings():
+                listings = await listing_manager.get_by_auctioneer_id(
+                    db, user_id, projected=True
+                )
+                return len(Feed(listings, None).render("Listings", None).body)
+
+            async def streamed_listings():
+                chunks = stream_detached(
+                    db, listing_manager.stream_by_auctioneer_id, user_id
+                )
+                return await drain(stream_listings("Listings", chunks))
+
+            async def buffered_bids():
+                bids = await bid_manager.get_by_listing_id(
+                    db, listing_id, projected=True
+                )
+
+                async def chunks():
+                    yield bids
+
+                return await drain(stream_bids("Bids", "Listing", chunks()))
+
+            async def streamed_bids():
+                chunks = stream_detached(
+                    db, bid_manager.stream_by_listing_id, listing_id
+                )
+                return await drain(stream_bids("Bids", "Listing", chunks))
+
+            print(f"\n{rows} listings and {rows} bids")
+            for label, func in (
+                ("listings before (buffered)", buffered_listings),
+                ("listings after (streamed)", streamed_listings),
+                ("bids before (buffered)", buffered_bids),
+                ("bids after (streamed)", streamed_bids),
+            ):
+                await measure(label, func)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    sizes = sys.argv[1] if len(sys.argv) > 1 else "1000,10000,50000"
+    asyncio.run(main([int(size) for size in sizes.split(",")]))
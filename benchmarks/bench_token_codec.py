@@ -0,0 +1,59 @@
+"""
+Compares the token codecs on the tokens the app issues: an access token with the
+user's id and a refresh token, encoded then decoded the way every login, refresh
+and authenticated request does. Reports encodes and decodes/second for each codec
+and checks that both sign the same tokens. Needs no database.
+
+Usage: python benchmarks/bench_token_codec.py [tokens]
+"""
+
+import os, sys, time
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.security import HmacCodec, JoseCodec
+
+
+def main(count: int) -> None:
+    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = [
+        {"exp": expire, "user_id": str(uuid4())}
+        if idx % 2
+        else {"exp": expire, "data": uuid4().hex[:10]}
+        for idx in range(count)
+    ]
+    jose_codec = JoseCodec(settings.SECRET_KEY)
+    hmac_codec = HmacCodec(settings.SECRET_KEY, fallback=jose_codec)
+    print(f"{count} tokens")
+
+    issued = {}
+    for label, codec in (
+        ("before (python-jose)", jose_codec),
+        ("after (stdlib hmac)", hmac_codec),
+    ):
+        start = time.perf_counter()
+        # jose turns the datetimes into timestamps in place, so each run gets copies
+        tokens = [codec.encode(dict(item)) for item in claims]
+        encoding = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = [codec.decode(token) for token in tokens]
+        decoding = time.perf_counter() - start
+
+        issued[label] = tokens
+        print(
+            f"{label:<22} encode={count / encoding:9.0f}/s"
+            f" decode={count / decoding:9.0f}/s"
+            f" valid={sum(1 for item in decoded if item)}"
+        )
+
+    print(f"identical tokens: {len(set(map(tuple, issued.values()))) == 1}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    main(count)
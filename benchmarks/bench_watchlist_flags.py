@@ -0,0 +1,89 @@
+"""
+Compares the per-listing watchlist lookup the listing feeds used to run against the
+single set-based lookup (`watchlist_manager.get_listing_ids_by_client_id`).
+
+Usage: BENCHMARK_DATABASE_URL=... python benchmarks/bench_watchlist_flags.py [listings] [iterations]
+"""
+
+import asyncio, os, sys
+
+sys.path.append(os.path.abspath("./"))  # To single-handedly execute this script
+
+from benchmarks.base import (
+    QueryCounter,
+    get_engine,
+    get_sessionmaker,
+    report,
+    reset_db,
+    seed_listings,
+    timed,
+)
+from app.api.schemas.listings import ListingDataSchema
+from app.db.managers.listings import listing_manager, watchlist_manager
+
+
+async def main(listings_count: int, iterations: int) -> None:
+    engine = get_engine()
+    await reset_db(engine)
+    SessionLocal = get_sessionmaker(engine)
+
+    async with SessionLocal() as db:
+        seeded = await seed_listings(db, listings_count)
+        client_id = seeded["user_id"]
+        # Watch every fourth listing
+        await watchlist_manager.bulk_create(
+            db,
+            [
+                {"user_id": client_id, "listing_id": listing_id}
+                for listing_id in seeded["listing_ids"][::4]
+            ],
+        )
+
+        async def per_listing_lookup():
+            listings = await listing_manager.get_all(db)
+            return [
+                ListingDataSchema(
+                    watchlist=(
+                        True
+                        if await watchlist_manager.get_by_client_id_and_listing_id(
+                            db, client_id, listing.id
+                        )
+                        else False
+                    ),
+                    time_left_seconds=listing.time_left_seconds,
+                    **listing.dict(),
+                )
+                for listing in listings
+            ]
+
+        async def set_lookup():
+            listings = await listing_manager.get_all(db)
+            watched_ids = await watchlist_manager.get_listing_ids_by_client_id(
+                db, client_id, [listing.id for listing in listings]
+            )
+            return [
+                ListingDataSchema(
+                    watchlist=listing.id in watched_ids,
+                    time_left_seconds=listing.time_left_seconds,
+                    **listing.dict(),
+                )
+                for listing in listings
+            ]
+
+        print(f"Feed of {listings_count} listings, {iterations} iterations")
+        for label, func in (
+            ("before (query per listing)", per_listing_lookup),
+            ("after (set-based lookup)", set_lookup),
+        ):
+            with QueryCounter(engine) as counter:
+                await func()
+            samples = await timed(func, iterations)
+            report(label, samples, queries=counter.count)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    listings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(listings_count, iterations))
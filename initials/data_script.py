@@ -1,7 +1,11 @@
 from app.core.config import settings
 from app.db.managers.accounts import user_manager
 from app.db.managers.general import sitedetail_manager, review_manager
-from app.db.managers.listings import category_manager, listing_manager
+from app.db.managers.listings import (
+    category_manager,
+    listing_manager,
+    related_listing_manager,
+)
 from app.db.managers.base import file_manager
 from app.api.utils.file_processors import FileProcessor
 
@@ -127,6 +131,9 @@ class CreateData(object):
                 )
                 updated_listing_mappings.append(mapping)
             await listing_manager.bulk_create(db, updated_listing_mappings)
+            for category_id in category_ids:
+                await related_listing_manager.refill(db, category_id)
+            await db.commit()
 
             # Upload Images
             for idx, image_file in enumerate(os.listdir(test_images_directory)):